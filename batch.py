@@ -0,0 +1,159 @@
+"""Run many simulated playthroughs of a level across worker processes.
+
+    python batch.py --level v3 --runs 10000 --max-ticks 5000
+
+Each run is either a seeded random walk or a scripted input sequence.
+Workers load the level once and send back a compact summary per run.
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import levels
+from engine import GameEngine
+
+_level = None  # the level this worker process plays, set by _init_worker
+CHUNKS_PER_WORKER = 4  # enough tasks that a worker with slow runs does not hold up the rest
+
+
+class RunSummary:
+    __slots__ = ("run", "won", "moves", "ticks", "rooms_visited", "items")
+
+    def __init__(self, run, won, moves, ticks, rooms_visited, items):
+        self.run = run
+        self.won = won
+        self.moves = moves              # moves to win, or moves made before giving up
+        self.ticks = ticks
+        self.rooms_visited = rooms_visited
+        self.items = items              # rooms whose items were taken, in order
+
+
+class _ItemLog:
+    """Engine listener that remembers the order items were collected in."""
+
+    def __init__(self):
+        self.items = []
+
+    def room_entered(self, room, first_visit):
+        pass
+
+    def item_collected(self, room, unlocked, opened):
+        self.items.append(room)
+
+    def game_won(self):
+        pass
+
+
+def random_walk(seed, max_ticks, max_run=10):
+    """Seeded inputs: a random direction held for 1..max_run ticks, repeated."""
+    rng = random.Random(seed)
+    inputs = []
+    while len(inputs) < max_ticks:
+        inputs.extend([rng.randrange(4)] * rng.randint(1, max_run))
+    del inputs[max_ticks:]
+    return inputs
+
+
+def play(level, run, inputs):
+    log = _ItemLog()
+    engine = GameEngine(level, listener=log)
+    ticks = 0
+    move = engine.move
+    for direction in inputs:
+        ticks += 1
+        if direction is not None:
+            move(direction)
+        if engine.game_over:
+            break
+    return RunSummary(run, engine.game_over, engine.moves, ticks,
+                      len(engine.visited_rooms), tuple(log.items))
+
+
+def _init_worker(level_name):
+    global _level
+    _level = levels.LEVELS[level_name]
+
+
+def _play_random_chunk(first_run, count, seed, max_ticks):
+    return [play(_level, run, random_walk(f"{seed}:{run}", max_ticks))
+            for run in range(first_run, first_run + count)]
+
+
+def _play_script_chunk(first_run, scripts):
+    return [play(_level, first_run + i, inputs) for i, inputs in enumerate(scripts)]
+
+
+class BatchResult:
+    def __init__(self, summaries, elapsed):
+        self.summaries = summaries
+        self.elapsed = elapsed
+        self.total_ticks = sum(s.ticks for s in summaries)
+        self.total_moves = sum(s.moves for s in summaries)
+        self.wins = sum(1 for s in summaries if s.won)
+
+    @property
+    def moves_per_second(self):
+        return self.total_moves / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def ticks_per_second(self):
+        return self.total_ticks / self.elapsed if self.elapsed else 0.0
+
+    def report(self):
+        won = [s.moves for s in self.summaries if s.won]
+        return {
+            "runs": len(self.summaries),
+            "wins": self.wins,
+            "mean_moves_to_win": sum(won) / len(won) if won else None,
+            "best_moves_to_win": min(won) if won else None,
+            "ticks": self.total_ticks,
+            "moves": self.total_moves,
+            "elapsed_s": round(self.elapsed, 3),
+            "moves_per_second": round(self.moves_per_second),
+            "ticks_per_second": round(self.ticks_per_second),
+        }
+
+
+def run_batch(level_name, runs=0, scripts=None, seed=0, max_ticks=5000,
+              workers=None, chunk_size=None):
+    """Play runs random walks, or the given input scripts, on a process pool.
+
+    By default the runs are split into CHUNKS_PER_WORKER chunks per worker.
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        total = len(scripts) if scripts is not None else runs
+        chunk_size = max(1, -(-total // (workers * CHUNKS_PER_WORKER)))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(level_name,)) as pool:
+        if scripts is not None:
+            futures = [pool.submit(_play_script_chunk, i, scripts[i:i + chunk_size])
+                       for i in range(0, len(scripts), chunk_size)]
+        else:
+            futures = [pool.submit(_play_random_chunk, i, min(chunk_size, runs - i),
+                                   seed, max_ticks)
+                       for i in range(0, runs, chunk_size)]
+        summaries = [summary for future in futures for summary in future.result()]
+    return BatchResult(summaries, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--level", default="v3", choices=sorted(levels.LEVELS))
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--max-ticks", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    result = run_batch(args.level, args.runs, seed=args.seed,
+                       max_ticks=args.max_ticks, workers=args.workers)
+    for key, value in result.report().items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
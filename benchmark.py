@@ -0,0 +1,165 @@
+"""Frame-time and move-throughput benchmarks for RoomGameV2 and RoomGameV3.
+
+    python benchmark.py --out results.json
+    python benchmark.py --baseline results.json --tolerance 0.15
+
+Each game runs on host.TransportGrid with a host.LocalTransport instead
+of a BRIDGES connection, the same stub the session host uses. The
+transport counts set_bg_color / draw_symbol calls and answers key_*
+from a scripted input trace. For every game and trace this measures game_loop frames per
+second, grid writes per frame, the fraction of frames the tick scheduler
+skipped, and moves per second through handle_input alone, taking the
+fastest of repeated runs. With --baseline, a result
+more than --tolerance slower than the baseline fails the run.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import time
+
+import batch
+import solver
+from host import GAMES, KEYS, LocalTransport, hosted_class
+
+
+def make_game(module, **options):
+    """module's RoomGame, given options, on a LocalTransport; set
+    game.transport.pressed to press a key."""
+    game = hosted_class(module)(0, "bench", "bench", **options)
+    game.transport = LocalTransport()
+    return game
+
+
+def traces(level, ticks):
+    """Scripted inputs (a direction or None per tick) to play on level."""
+    return {
+        "route": solver.solve(level).inputs,
+        "random": batch.random_walk(f"bench:{level.name}", ticks),
+        "idle": [None] * ticks,
+    }
+
+
+def time_frames(module, trace):
+    game = make_game(module)
+    frames = 0
+    start = time.perf_counter()
+    for direction in trace:
+        game.transport.pressed = None if direction is None else KEYS[direction]
+        game.game_loop()
+        frames += 1
+        if game.game_over:
+            break
+    elapsed = time.perf_counter() - start
+    return frames, elapsed, game.transport.writes, game.scheduler.skipped_fraction
+
+
+def time_moves(module, trace):
+    game = make_game(module)
+    start = time.perf_counter()
+    for direction in trace:
+        game.transport.pressed = None if direction is None else KEYS[direction]
+        game.poll_keys()
+        game.handle_input()
+        if game.game_over:
+            break
+    elapsed = time.perf_counter() - start
+    return game.engine.moves, elapsed
+
+
+def best_of(measure, repeat, min_time):
+    """Fastest of at least repeat runs of measure, rerun until min_time has passed.
+
+    measure returns a tuple whose second entry is the elapsed time.
+    """
+    results = []
+    spent = 0.0
+    while len(results) < repeat or spent < min_time:
+        result = measure()
+        results.append(result)
+        spent += result[1]
+    return min(results, key=lambda result: result[1])
+
+
+def run(games=("v2", "v3"), ticks=2000, repeat=3, min_time=0.2):
+    results = []
+    for name in games:
+        module = GAMES[name]
+        for trace_name, trace in traces(module.LEVEL, ticks).items():
+            # Keep the games' pickup messages out of the timings.
+            with contextlib.redirect_stdout(io.StringIO()):
+                frames, frame_time, writes, skipped = best_of(lambda: time_frames(module, trace),
+                                                     repeat, min_time)
+                moves, move_time = best_of(lambda: time_moves(module, trace),
+                                           repeat, min_time)
+            results.append({
+                "game": name,
+                "trace": trace_name,
+                "frames": frames,
+                "fps": round(frames / frame_time, 1),
+                "grid_writes": writes,
+                "grid_writes_per_frame": round(writes / frames, 2),
+                "skipped_frames": round(skipped, 3),
+                "moves": moves,
+                "moves_per_second": round(moves / move_time) if moves else 0,
+            })
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "ticks": ticks,
+        "repeat": repeat,
+        "min_time": min_time,
+        "results": results,
+    }
+
+
+def regressions(report, baseline, tolerance):
+    """Results slower than baseline by more than tolerance, as messages."""
+    old = {(r["game"], r["trace"]): r for r in baseline["results"]}
+    found = []
+    for result in report["results"]:
+        before = old.get((result["game"], result["trace"]))
+        if before is None:
+            continue
+        for metric in ("fps", "moves_per_second"):
+            if before[metric] and result[metric] < before[metric] * (1 - tolerance):
+                found.append(f"{result['game']}/{result['trace']} {metric}: "
+                             f"{before[metric]} -> {result[metric]}")
+        if result["grid_writes"] > before["grid_writes"]:
+            found.append(f"{result['game']}/{result['trace']} grid_writes: "
+                         f"{before['grid_writes']} -> {result['grid_writes']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", nargs="+", default=sorted(GAMES), choices=sorted(GAMES))
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="seconds to keep repeating each measurement for")
+    parser.add_argument("--out", default="benchmark.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    report = run(args.games, args.ticks, args.repeat, args.min_time)
+    for r in report["results"]:
+        print(f"{r['game']:>3} {r['trace']:<7} {r['fps']:>10.1f} fps "
+              f"{r['grid_writes_per_frame']:>8.2f} writes/frame "
+              f"{r['moves_per_second']:>9} moves/s")
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        for message in found:
+            print(f"regression: {message}")
+        if found:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
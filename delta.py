@@ -0,0 +1,248 @@
+"""Delta-encoded frames between a game and its grid.
+
+    python delta.py --game v3 --ticks 2000 --loss 0.05
+
+Each frame is sent as the difference from the last frame the receiver
+acknowledged. A cell is 3 bytes (background, symbol, symbol color; every
+NamedColor / NamedSymbol value fits in a byte) and changed cells go out
+as runs:
+
+    varint skip     unchanged cells before the run (row-major)
+    varint count    cells in the run
+    3 bytes         the value every cell in the run takes
+
+so a wall or room fill is one run however large. A keyframe is the same
+thing against an empty grid. One is sent every keyframe_interval frames,
+and whenever the receiver reports it lacks the base frame, can't parse
+the message or its CRC check fails (a desync).
+
+MockReceiver rebuilds frames the way a client would, for tests, and
+DeltaTransport plugs the pair into host.SessionHost.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import struct
+import zlib
+
+import numpy as np
+
+import batch
+import host
+
+KEYFRAME, DELTA = 0, 1
+HEADER = struct.Struct("<BIII")  # kind, frame, base frame, crc32 of the frame
+
+
+def pack_cells(bg, symbol, symbol_color):
+    """The three planes as one flat int32 per cell."""
+    return ((bg.astype(np.int32) << 16) | (symbol.astype(np.int32) << 8)
+            | symbol_color.astype(np.int32)).ravel()
+
+
+def _varint(out, value):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_runs(cells, base):
+    """Runs turning base into cells (base None: from an empty grid)."""
+    changed = np.flatnonzero(cells if base is None else cells != base)
+    out = bytearray()
+    if not len(changed):
+        return out
+    values = cells[changed]
+    # A run breaks where the changed cells stop being adjacent or change value.
+    breaks = np.flatnonzero((np.diff(changed) != 1) | (np.diff(values) != 0)) + 1
+    starts = np.concatenate(([0], breaks))
+    lengths = np.diff(np.append(starts, len(changed)))
+    position = 0
+    for start, length, value in zip(changed[starts].tolist(), lengths.tolist(),
+                                    values[starts].tolist()):
+        _varint(out, start - position)
+        _varint(out, length)
+        out += value.to_bytes(3, "big")
+        position = start + length
+    return out
+
+
+def apply_runs(cells, data, pos):
+    position = 0
+    while pos < len(data):
+        skip, pos = _read_varint(data, pos)
+        count, pos = _read_varint(data, pos)
+        position += skip
+        cells[position:position + count] = int.from_bytes(data[pos:pos + 3], "big")
+        pos += 3
+        position += count
+
+
+class FrameEncoder:
+    """Turns frames into messages against the last acknowledged frame."""
+
+    def __init__(self, keyframe_interval=300, history=32):
+        self.keyframe_interval = keyframe_interval
+        self.history = history
+        self.frame = 0
+        self.sent = {}              # frame -> cells, until acknowledged or too old
+        self.acked_frame = None
+        self.acked_cells = None
+        self.last_keyframe = None
+        self.keyframes = 0
+
+    def encode(self, bg, symbol, symbol_color):
+        cells = pack_cells(bg, symbol, symbol_color)
+        self.frame += 1
+        keyframe = (self.acked_cells is None or self.last_keyframe is None
+                    or self.frame - self.last_keyframe >= self.keyframe_interval)
+        if keyframe:
+            kind, base, body = KEYFRAME, 0, encode_runs(cells, None)
+            self.last_keyframe = self.frame
+            self.keyframes += 1
+        else:
+            kind, base, body = DELTA, self.acked_frame, encode_runs(cells, self.acked_cells)
+        self.sent[self.frame] = cells
+        if len(self.sent) > self.history:
+            del self.sent[min(self.sent)]
+        return HEADER.pack(kind, self.frame, base, zlib.crc32(cells.tobytes())) + body
+
+    def ack(self, frame):
+        cells = self.sent.get(frame)
+        if cells is None or (self.acked_frame is not None and frame <= self.acked_frame):
+            return
+        self.acked_frame, self.acked_cells = frame, cells
+        for old in [f for f in self.sent if f < frame]:
+            del self.sent[old]
+
+    def desync(self):
+        """The receiver lost track: the next frame is a keyframe."""
+        self.acked_frame = self.acked_cells = None
+
+
+class MockReceiver:
+    """Rebuilds frames from messages, as a client on the other end would."""
+
+    def __init__(self, rows, cols, history=32):
+        self.rows = rows
+        self.cols = cols
+        self.history = history
+        self.frames = {}        # frame -> cells, kept as bases for later deltas
+        self.current = None
+
+    def receive(self, message):
+        """Apply message; return (True, frame) to acknowledge or (False, frame) on desync."""
+        kind, frame, base, crc = HEADER.unpack_from(message)
+        if kind == KEYFRAME:
+            cells = np.zeros(self.rows * self.cols, dtype=np.int32)
+        elif kind == DELTA and base in self.frames:
+            cells = self.frames[base].copy()
+        else:
+            return False, frame
+        try:
+            apply_runs(cells, message, HEADER.size)
+        except IndexError:  # a damaged message ran off its end
+            return False, frame
+        if zlib.crc32(cells.tobytes()) != crc:
+            return False, frame
+        self.frames[frame] = cells
+        if len(self.frames) > self.history:
+            del self.frames[min(self.frames)]
+        self.current = cells
+        return True, frame
+
+    def planes(self):
+        """(bg, symbol, symbol_color) of the newest frame."""
+        cells = self.current.reshape(self.rows, self.cols)
+        return cells >> 16, (cells >> 8) & 0xFF, cells & 0xFF
+
+
+class DeltaTransport(host.LocalTransport):
+    """LocalTransport that ships each frame through a FrameEncoder to a MockReceiver.
+
+    loss drops that fraction of messages (and their acknowledgements) on the
+    way; the encoder just keeps sending deltas against the last frame that
+    got through. corrupt (loss unless given) flips a bit in that fraction
+    of the messages that do arrive, which the receiver catches as a
+    desync, so recovery with a keyframe gets exercised too.
+    """
+
+    def __init__(self, inputs=(), rows=32, cols=32, keyframe_interval=300, loss=0.0, seed=0,
+                 corrupt=None):
+        super().__init__(inputs, rows, cols)
+        self.encoder = FrameEncoder(keyframe_interval)
+        self.receiver = MockReceiver(rows, cols)
+        self.loss = loss
+        self.corrupt = loss if corrupt is None else corrupt
+        self.rng = random.Random(seed)
+        self.bytes_sent = 0
+        self.desyncs = 0
+
+    def end_frame(self):
+        super().end_frame()
+        message = self.encoder.encode(self.bg, self.symbol, self.symbol_color)
+        self.bytes_sent += len(message)
+        if self.loss and self.rng.random() < self.loss:
+            return
+        if self.corrupt and self.rng.random() < self.corrupt:
+            damaged = bytearray(message)
+            damaged[self.rng.randrange(len(damaged))] ^= 1 << self.rng.randrange(8)
+            message = bytes(damaged)
+        acked, frame = self.receiver.receive(message)
+        if acked:
+            self.encoder.ack(frame)
+        else:
+            self.desyncs += 1
+            self.encoder.desync()
+
+    @property
+    def bytes_per_frame(self):
+        return self.bytes_sent / self.frames if self.frames else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--game", default="v3", choices=sorted(host.GAMES))
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--loss", type=float, default=0.0, help="fraction of messages dropped")
+    parser.add_argument("--corrupt", type=float, default=None,
+                        help="fraction of delivered messages with a flipped bit (default: --loss)")
+    parser.add_argument("--keyframe-interval", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    session_host = host.SessionHost(args.game)
+    module = host.GAMES[args.game]
+    transport = DeltaTransport(batch.random_walk(f"delta:{args.seed}", args.ticks),
+                               module.ROWS, module.COLS, args.keyframe_interval,
+                               args.loss, args.seed, args.corrupt)
+    session_host.open(transport)
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(session_host.run())
+
+    full_frame = HEADER.size + 3 * module.ROWS * module.COLS
+    acked = transport.encoder.acked_cells
+    in_sync = acked is not None and (transport.receiver.current == acked).all()
+    print(f"frames: {transport.frames}")
+    print(f"bytes per frame: {transport.bytes_per_frame:.1f} (a raw frame is {full_frame})")
+    print(f"keyframes: {transport.encoder.keyframes}")
+    print(f"desyncs: {transport.desyncs}")
+    print(f"receiver matches the last frame it acknowledged: {in_sync}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+from collections import deque
+
+
+class DoorGraph:
+    """Which rooms each door joins, compiled once per level and never changed.
+
+    neighbors[room] lists (other_room, door) pairs and door_tiles[door] the
+    grid tiles of door d (connections[d]). exits[room] is the same minus
+    the one-way doors that can't be entered from room. gates (rules.Gates)
+    decide which rooms and doors start closed; the open/closed state of
+    one game is a DoorState.
+    """
+
+    def __init__(self, room_count, connections, doors, gates):
+        self.connections = tuple(connections)
+        self.door_tiles = tuple(map(tuple, doors))
+        self.gates = gates
+        neighbors = [[] for _ in range(room_count)]
+        for door, (a, b) in enumerate(self.connections):
+            neighbors[a].append((b, door))
+            neighbors[b].append((a, door))
+        self.neighbors = tuple(tuple(pairs) for pairs in neighbors)
+        if gates.one_way:
+            self.exits = tuple(
+                tuple((other, door) for other, door in pairs if gates.may_enter(door, room))
+                for room, pairs in enumerate(self.neighbors)
+            )
+        else:
+            self.exits = self.neighbors
+        self.locked_rooms = frozenset(room for room, need in enumerate(gates.room_need) if need)
+        self.initial_doors = frozenset(
+            door for door in range(len(self.connections)) if gates.door_open(door, connections, 0)
+        )
+
+    def new_state(self, start_room=0):
+        """A fresh DoorState for one game starting in start_room."""
+        return DoorState(self, start_room)
+
+
+class DoorState:
+    """Open rooms, open doors and rooms reachable from the start in one game.
+
+    The sets only change in collect() and unlock(), so reading them every
+    frame is free.
+    """
+
+    def __init__(self, graph, start_room=0):
+        self.graph = graph
+        self.open_rooms = set(range(len(graph.neighbors))) - graph.locked_rooms
+        # Doors whose own keys are held; they open once both rooms are open too.
+        self.unlocked_doors = {door for door, need in enumerate(graph.gates.door_need) if not need}
+        self.open_doors = set(graph.initial_doors)
+        self.open_tiles = {tile for door in self.open_doors for tile in graph.door_tiles[door]}
+        self.reachable = set()
+        if start_room in self.open_rooms:
+            self._spread(start_room)
+
+    def collect(self, key, item_mask):
+        """Open what taking the item in room key completes; return (rooms, doors) opened.
+
+        item_mask holds every item collected so far, key included.
+        """
+        gates = self.graph.gates
+        gated_rooms, gated_doors = gates.by_key.get(key, ((), ()))
+        rooms = [room for room in gated_rooms
+                 if room not in self.open_rooms and not gates.room_need[room] & ~item_mask]
+        doors = [door for door in gated_doors
+                 if door not in self.unlocked_doors and not gates.door_need[door] & ~item_mask]
+        if not rooms and not doors:
+            return rooms, doors
+        return rooms, self.unlock(rooms, doors)
+
+    def unlock(self, rooms, doors=()):
+        """Open rooms and unlock doors; return the doors that are now open."""
+        self.open_rooms.update(rooms)
+        self.unlocked_doors.update(doors)
+        graph = self.graph
+        candidates = [door for room in rooms for _, door in graph.neighbors[room]]
+        candidates.extend(doors)
+        opened = []
+        for door in candidates:
+            if door in self.open_doors or door not in self.unlocked_doors:
+                continue
+            a, b = graph.connections[door]
+            if a not in self.open_rooms or b not in self.open_rooms:
+                continue
+            self.open_doors.add(door)
+            self.open_tiles.update(graph.door_tiles[door])
+            opened.append(door)
+            if a in self.reachable and graph.gates.may_enter(door, a):
+                self._spread(b)
+            if b in self.reachable and graph.gates.may_enter(door, b):
+                self._spread(a)
+        return opened
+
+    def open_doors_of(self, room):
+        return [door for _, door in self.graph.neighbors[room] if door in self.open_doors]
+
+    def is_reachable(self, room):
+        return room in self.reachable
+
+    def _spread(self, room):
+        if room in self.reachable:
+            return
+        self.reachable.add(room)
+        queue = deque([room])
+        while queue:
+            current = queue.popleft()
+            for other, door in self.graph.exits[current]:
+                if door in self.open_doors and other not in self.reachable:
+                    self.reachable.add(other)
+                    queue.append(other)
@@ -0,0 +1,139 @@
+from state import GameState, SnapshotRing, rooms_in
+
+UP, DOWN, LEFT, RIGHT = range(4)
+DIRECTIONS = {"up": UP, "down": DOWN, "left": LEFT, "right": RIGHT}
+DELTAS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+class GameEngine:
+    """The Room Game rules without any BRIDGES dependency.
+
+    Movement, gating through the level's compiled rules (rules.Gates), item
+    collection and the win check all live here. A listener (RoomGame, for
+    one) can be told about what happens through room_entered(room,
+    first_visit), item_collected(room, unlocked_rooms, opened_doors) and
+    game_won(). doors tracks which doors are open and which rooms can be
+    reached, updated only on unlocks.
+    item_mask and visited_mask mirror the sets as bitmasks so snapshot()
+    stays cheap. With undo_depth set, the last undo_depth moves can be
+    taken back with undo().
+    """
+
+    def __init__(self, level, listener=None, undo_depth=0):
+        self.level = level
+        self.layout = level.layout
+        self.listener = listener
+        self.walkable = self.layout.new_walkable()
+        self.entry = self.layout.entry
+        self.doors = self.layout.graph.new_state()
+        self.player_room = 0
+        self.player_pos = list(level.spawn)
+        self.items_collected = set()
+        self.visited_rooms = {0}
+        self.item_mask = 0
+        self.visited_mask = 1
+        self.score = 0
+        self.game_over = False
+        self.moves = 0
+        self.history = SnapshotRing(undo_depth) if undo_depth else None
+
+    def move(self, direction):
+        """Try to step one tile; return True if the player moved."""
+        if self.game_over:
+            return False
+        dr, dc = DELTAS[direction]
+        r = self.player_pos[0] + dr
+        c = self.player_pos[1] + dc
+        layout = self.layout
+        # Rooms and doors are walkable unless still locked; walls never are.
+        if not (0 <= r < layout.rows and 0 <= c < layout.cols and self.walkable[r, c]):
+            return False
+        # A one-way door can only be stepped into from its entry room.
+        if self.entry is not None:
+            entry = self.entry.item(r, c)
+            if entry >= 0 and entry != self.player_room:
+                return False
+        if self.history is not None:
+            self.history.push(self.snapshot())
+        self.player_pos = [r, c]
+        self.moves += 1
+        new_room = layout.room_at(r, c)
+        if new_room is None:
+            return True
+
+        if new_room != self.player_room:
+            self.player_room = new_room
+            first_visit = new_room not in self.visited_rooms
+            self.visited_rooms.add(new_room)
+            self.visited_mask |= 1 << new_room
+            if self.listener is not None:
+                self.listener.room_entered(new_room, first_visit)
+
+        if self.level.rooms[new_room]["item"] and new_room not in self.items_collected:
+            self.items_collected.add(new_room)
+            self.item_mask |= 1 << new_room
+            self.score += 1
+            unlocked, opened = self.doors.collect(new_room, self.item_mask)
+            if opened or unlocked:
+                layout.open(self.walkable, unlocked, opened)
+            if self.listener is not None:
+                self.listener.item_collected(new_room, unlocked, opened)
+            if len(self.items_collected) == self.level.total_items:
+                self.game_over = True
+                if self.listener is not None:
+                    self.listener.game_won()
+        return True
+
+    def run(self, inputs):
+        """Apply a sequence of directions (None for an idle tick); return self."""
+        for direction in inputs:
+            if self.game_over:
+                break
+            if direction is not None:
+                self.move(direction)
+        return self
+
+    def snapshot(self):
+        return GameState(self.player_pos[0], self.player_pos[1], self.player_room,
+                         self.item_mask, self.visited_mask, self.moves)
+
+    def restore(self, state):
+        """Put the game back to a snapshot() taken on the same level."""
+        layout = self.layout
+        held = self.item_mask
+        self.player_pos = [state.row, state.col]
+        self.player_room = state.room
+        self.item_mask = state.items
+        self.visited_mask = state.visited
+        self.items_collected = set(rooms_in(state.items))
+        self.visited_rooms = set(rooms_in(state.visited))
+        self.score = len(self.items_collected)
+        self.game_over = 0 < self.score == self.level.total_items
+        self.moves = state.moves
+        # Gates only ever open and depend on nothing but the keys held, so
+        # the same keys keep the doors as they are, more keys only need the
+        # new ones played, and only fewer keys rebuild the doors from scratch.
+        if state.items & held == held:
+            keys = state.items & ~held
+        else:
+            keys = state.items
+            self.walkable[:] = layout.walkable
+            self.doors = layout.graph.new_state()
+        for room in rooms_in(keys):
+            unlocked, opened = self.doors.collect(room, self.item_mask)
+            if opened or unlocked:
+                layout.open(self.walkable, unlocked, opened)
+
+    def undo(self):
+        """Take back the last move; return False if there is none to take back.
+
+        The listener is not told; redraw from the engine afterwards.
+        """
+        if not self.history:
+            return False
+        self.restore(self.history.pop())
+        return True
+
+
+def simulate(level, inputs):
+    return GameEngine(level).run(inputs)
@@ -0,0 +1,103 @@
+import numpy as np
+from bridges.named_symbol import NamedSymbol
+from bridges.named_color import NamedColor
+
+TRANSPARENT = -1
+
+# NamedColor / NamedSymbol members indexed by their value, to turn plane
+# entries back into the enums the game grid expects.
+COLORS = [None] * (max(c.value for c in NamedColor) + 1)
+for _color in NamedColor:
+    COLORS[_color.value] = _color
+SYMBOLS = [None] * (max(s.value for s in NamedSymbol) + 1)
+for _symbol in NamedSymbol:
+    SYMBOLS[_symbol.value] = _symbol
+
+
+class FrameBuffer:
+    """Background color, symbol and symbol color planes for a grid of cells.
+
+    Single cells are drawn with the same calls as NonBlockingGame and
+    rectangles with fill()/clear()/paste(), which are plain slice
+    assignments. Nothing reaches the game grid until flush().
+    """
+
+    def __init__(self, rows, cols, fill=TRANSPARENT):
+        self.rows = rows
+        self.cols = cols
+        self.bg = np.full((rows, cols), fill, dtype=np.int16)
+        self.symbol = np.full((rows, cols), fill, dtype=np.int16)
+        self.symbol_color = np.full((rows, cols), fill, dtype=np.int16)
+        self.front_bg = None
+        self.front_symbol = None
+        self.front_symbol_color = None
+        self.dirty = True
+
+    def set_bg_color(self, row, col, color):
+        if self.bg[row, col] != color.value:
+            self.bg[row, col] = color.value
+            self.dirty = True
+
+    def draw_symbol(self, row, col, symbol, color):
+        if self.symbol[row, col] != symbol.value or self.symbol_color[row, col] != color.value:
+            self.symbol[row, col] = symbol.value
+            self.symbol_color[row, col] = color.value
+            self.dirty = True
+
+    def fill(self, top, left, height, width, color):
+        # Same as set_bg_color + draw_symbol(NamedSymbol.none) over the rectangle.
+        cells = (slice(top, top + height), slice(left, left + width))
+        self.bg[cells] = color.value
+        self.symbol[cells] = NamedSymbol.none.value
+        self.symbol_color[cells] = color.value
+        self.dirty = True
+
+    def clear(self, top=0, left=0, height=None, width=None):
+        if height is None:
+            height = self.rows - top
+        if width is None:
+            width = self.cols - left
+        cells = (slice(top, top + height), slice(left, left + width))
+        self.bg[cells] = TRANSPARENT
+        self.symbol[cells] = TRANSPARENT
+        self.symbol_color[cells] = TRANSPARENT
+        self.dirty = True
+
+    def paste(self, top, left, source, source_top, source_left, height, width):
+        """Copy a height x width rectangle of source, from (source_top, source_left), to (top, left)."""
+        src = (slice(source_top, source_top + height), slice(source_left, source_left + width))
+        dst = (slice(top, top + height), slice(left, left + width))
+        self.bg[dst] = source.bg[src]
+        self.symbol[dst] = source.symbol[src]
+        self.symbol_color[dst] = source.symbol_color[src]
+        self.dirty = True
+
+    def invalidate(self):
+        # Forget the flushed frame so the next flush rewrites every cell.
+        self.front_bg = None
+
+    def flush(self, game):
+        """Write the cells that differ from the last flush to game; return how many."""
+        if self.front_bg is None:
+            changed = np.ones((self.rows, self.cols), dtype=bool)
+        else:
+            changed = ((self.bg != self.front_bg)
+                       | (self.symbol != self.front_symbol)
+                       | (self.symbol_color != self.front_symbol_color))
+        rows, cols = np.nonzero(changed)
+        bg = self.bg[rows, cols].tolist()
+        symbol = self.symbol[rows, cols].tolist()
+        symbol_color = self.symbol_color[rows, cols].tolist()
+        for r, c, b, s, sc in zip(rows.tolist(), cols.tolist(), bg, symbol, symbol_color):
+            game.set_bg_color(r, c, COLORS[b])
+            game.draw_symbol(r, c, SYMBOLS[s], COLORS[sc])
+        if self.front_bg is None:
+            self.front_bg = self.bg.copy()
+            self.front_symbol = self.symbol.copy()
+            self.front_symbol_color = self.symbol_color.copy()
+        else:
+            np.copyto(self.front_bg, self.bg)
+            np.copyto(self.front_symbol, self.symbol)
+            np.copyto(self.front_symbol_color, self.symbol_color)
+        self.dirty = False
+        return len(bg)
@@ -0,0 +1,109 @@
+from bridges.non_blocking_game import NonBlockingGame
+from engine import GameEngine, DIRECTIONS
+from recording import InputRecorder
+from inputqueue import InputQueue
+from scheduler import TickScheduler
+from profiler import FrameProfiler, GAME_STAGES
+import atexit
+
+
+class GameFrontEnd(NonBlockingGame):
+    """What every BRIDGES front end over engine.GameEngine shares.
+
+    Key polling, the input queue, recording and profiling live here, so a
+    game (RoomGameV2, RoomGameV3) only draws. Subclasses build their
+    buffers after calling __init__ and then call attach_profiler().
+    """
+
+    def __init__(self, assid, login, apikey, rows, cols, level,
+                 record_to=None, profile_to=None, moves_per_tick=4):
+        super().__init__(assid, login, apikey, rows, cols)
+        self.level = level
+        self.engine = GameEngine(level, listener=self)
+        # With record_to set, every tick's input is saved there on a win, or
+        # at exit if the game is never won; winning drops the exit hook so
+        # a finished game isn't kept alive until the program ends.
+        self.record_to = record_to
+        self.recorder = InputRecorder(level) if record_to else None
+        if record_to:
+            atexit.register(self.save_recording)
+        self.room_positions = level.room_positions  # stores (top-left r, c) of each room
+        # Key events wait here; up to moves_per_tick of them are moved each tick.
+        self.inputs = InputQueue(budget=moves_per_tick)
+        self.held_key = None
+        # game_loop only does work on ticks with input or a timer due.
+        self.scheduler = TickScheduler()
+        self.profile_to = profile_to
+        self.profiler = None
+
+    def attach_profiler(self, stages, buffers):
+        """With profile_to set, time game_loop, its GAME_STAGES and the extra
+        (name, owner, method name) stages, counting cells drawn into buffers."""
+        if not self.profile_to:
+            return
+        stages = [(name, self, name) for name in GAME_STAGES if hasattr(self, name)] + stages
+        self.profiler = FrameProfiler(self.profile_to).attach(self, stages, buffers)
+        self.profiler.sources["input"] = self.inputs.report
+
+    player_pos = property(lambda self: self.engine.player_pos)
+    player_room = property(lambda self: self.engine.player_room)
+    items_collected = property(lambda self: self.engine.items_collected)
+    visited_rooms = property(lambda self: self.engine.visited_rooms)
+    walkable = property(lambda self: self.engine.walkable)
+    door_positions = property(lambda self: self.engine.doors.open_tiles)
+    score = property(lambda self: self.engine.score)
+    game_over = property(lambda self: self.engine.game_over)
+    total_items = property(lambda self: self.level.total_items)
+
+    def queue_key(self, key):
+        """Queue a press of key ("up", "down", ...) from outside the grid, e.g. a bot."""
+        if not self.game_over:
+            self.inputs.push(DIRECTIONS[key])
+
+    def poll_keys(self):
+        key = None
+        if self.key_up():
+            key = "up"
+        elif self.key_down():
+            key = "down"
+        elif self.key_left():
+            key = "left"
+        elif self.key_right():
+            key = "right"
+        if key:
+            self.inputs.push(DIRECTIONS[key], repeat=key == self.held_key)
+        self.held_key = key
+
+    def handle_input(self):
+        moves = self.inputs.drain()
+        if not moves and self.recorder is not None:
+            self.recorder.record(None)
+        for direction in moves:
+            # One recorded tick per move replays to the same state.
+            if self.recorder is not None:
+                self.recorder.record(direction)
+            self.engine.move(direction)
+            if self.game_over:
+                self.inputs.clear()
+                break
+
+    def room_entered(self, room, first_visit):
+        self.scheduler.wake()
+
+    def item_collected(self, room, unlocked, opened):
+        self.scheduler.wake()
+        rooms = self.level.rooms
+        print(f"Collected {rooms[room]['item']} in {rooms[room]['name']}!")
+
+    def game_won(self):
+        print("🎉 You win!")
+        self.scheduler.wake()  # the win screen is drawn on the next tick
+        if self.recorder is not None:
+            self.save_recording()
+            atexit.unregister(self.save_recording)
+
+    def save_recording(self, path=None):
+        """Save the input so far with the engine's current state; a later
+        save (at exit, say) writes the longer session over it."""
+        if self.recorder is not None:
+            self.recorder.finish(self.engine).save(path or self.record_to)
@@ -0,0 +1,224 @@
+"""Generate room mazes of any size that can always be won.
+
+    python generator.py --size 100x100 --items 500 --locks 20 --out level_data/big.json
+
+Rooms sit on a rows x cols grid. A random spanning tree (Kruskal with a
+union-find) guarantees every room can be reached; loop_fraction of the
+remaining neighbour pairs get a door too. Items go in random rooms, and
+each lock shuts a room until the item in its key room is taken, the way
+the Key opens the Secret Room in V3. Keys are always placed where they
+can be reached with every lock so far still shut, so each new lock keeps
+the level winnable and later locks can hide earlier keys. unlock_waves()
+checks the result the way a player would have to play it.
+"""
+import argparse
+import json
+import random
+import time
+from collections import deque
+
+from levels import Level
+
+ADJECTIVES = ["Dusty", "Silent", "Frozen", "Hidden", "Sunken", "Glowing", "Ancient", "Narrow",
+              "Crystal", "Misty", "Broken", "Golden", "Dark", "Echoing", "Mossy", "Royal"]
+NOUNS = ["Hall", "Cellar", "Vault", "Chamber", "Library", "Gallery", "Crypt", "Garden",
+         "Armory", "Shrine", "Passage", "Cavern", "Study", "Tower", "Pool", "Forge"]
+ITEMS = ["Torch", "Web", "Book", "Gold", "Gem", "Sword", "Shield", "Map", "Lamp", "Ring",
+         "Coin", "Scroll"]
+KEY = "Key"
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        """Join the sets of a and b; return False if they were already one set."""
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return True
+
+
+def maze_doors(rows, cols, rng, loop_fraction):
+    """Door pairs for a rows x cols grid of rooms: a spanning tree plus some loops."""
+    edges = [(idx, idx + 1) for idx in range(rows * cols) if (idx + 1) % cols]
+    edges += [(idx, idx + cols) for idx in range((rows - 1) * cols)]
+    rng.shuffle(edges)
+    sets = UnionFind(rows * cols)
+    tree = []
+    spare = []
+    for a, b in edges:
+        (tree if sets.union(a, b) else spare).append((a, b))
+    return tree + spare[:round(len(spare) * loop_fraction)]
+
+
+def _reachable(neighbors, start, closed):
+    seen = bytearray(len(neighbors))
+    seen[start] = 1
+    queue = deque([start])
+    while queue:
+        room = queue.popleft()
+        for other in neighbors[room]:
+            if not seen[other] and other not in closed:
+                seen[other] = 1
+                queue.append(other)
+    return seen
+
+
+def unlock_waves(room_count, connections, locks, items, start=0):
+    """Rooms opened by each round of collecting every reachable key, or None.
+
+    This is the solvability check: starting from start with every locked
+    room shut, take every item that can be reached, open the rooms those
+    keys unlock and repeat. The level can be won only if every room with
+    an item is reached in the end; then the waves are returned (wave 0 is
+    what is open from the start).
+    """
+    neighbors = [[] for _ in range(room_count)]
+    for a, b in connections:
+        neighbors[a].append(b)
+        neighbors[b].append(a)
+    opens = {}
+    for room, key in locks.items():
+        opens.setdefault(key, []).append(room)
+
+    closed = set(locks)
+    if start in closed:
+        return None
+    taken = set()
+    waves = []
+    while True:
+        seen = _reachable(neighbors, start, closed)
+        wave = [room for room in range(room_count) if seen[room] and room not in taken]
+        waves.append(wave)
+        opened = []
+        for room in wave:
+            if room in items:
+                opened.extend(opens.get(room, ()))
+        taken.update(wave)
+        opened = [room for room in opened if room in closed]
+        if not opened:
+            break
+        closed.difference_update(opened)
+    if all(room in taken for room in items):
+        return waves
+    return None
+
+
+def place_locks(room_count, connections, item_rooms, lock_count, rng, start=0):
+    """locks (locked room -> key room) that always leave the level winnable.
+
+    Fewer than lock_count locks come back when the rooms still reachable
+    run out of keys to hand out.
+    """
+    neighbors = [[] for _ in range(room_count)]
+    for a, b in connections:
+        neighbors[a].append(b)
+        neighbors[b].append(a)
+    locks = {}
+    seen = _reachable(neighbors, start, ())
+    # Unused keys in the rooms reachable with every lock shut.
+    keys = [room for room in item_rooms if seen[room]]
+    searches = 4 * lock_count + 16  # bounds the time spent on rooms that cut off every key
+    candidates = [room for room in range(room_count) if room != start]
+    rng.shuffle(candidates)
+    for room in candidates:
+        if len(locks) == lock_count or not keys:
+            break
+        if seen[room]:
+            # Shutting a reachable room shrinks the reachable part.
+            if not searches:
+                continue
+            searches -= 1
+            trial = _reachable(neighbors, start, set(locks) | {room})
+            trial_keys = [key for key in keys if trial[key]]
+            if not trial_keys:
+                continue
+            seen, keys = trial, trial_keys
+        # Otherwise the room is already behind a lock and nothing changes.
+        key = keys.pop(rng.randrange(len(keys)))
+        locks[room] = key
+    return locks
+
+
+def generate(rows, cols, seed=0, items=None, locks=0, loop_fraction=0.1, room_size=10,
+             wall_size=1, name=None):
+    """A rows x cols room maze as a Level that is guaranteed to be winnable."""
+    rng = random.Random(seed)
+    count = rows * cols
+    connections = maze_doors(rows, cols, rng, loop_fraction)
+    if items is None:
+        items = max(1, count // 10)
+    item_rooms = rng.sample(range(count), min(items, count))
+    lock_table = place_locks(count, connections, item_rooms, locks, rng)
+
+    keys = set(lock_table.values())
+    item_of = {}
+    for n, room in enumerate(item_rooms):
+        item_of[room] = KEY if room in keys else ITEMS[n % len(ITEMS)]
+    rooms = [{"name": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}", "item": item_of.get(idx)}
+             for idx in range(count)]
+
+    if unlock_waves(count, connections, lock_table, set(item_rooms)) is None:
+        raise RuntimeError(f"Generated level {seed} cannot be won")
+    grid_size = max(rows, cols) * (room_size + wall_size) - wall_size
+    return Level(name or f"maze{rows}x{cols}-{seed}", rooms, grid_size, room_size, connections,
+                 lock_table, wall_size=wall_size, rooms_per_row=cols)
+
+
+def to_spec(level, rooms_per_row):
+    """level as a dict in the level file format (see levels.load_level)."""
+    return {
+        "name": level.name,
+        "grid_size": level.grid_size,
+        "room_size": level.room_size,
+        "wall_size": level.wall_size,
+        "rooms_per_row": rooms_per_row,
+        "rooms": level.rooms,
+        "doors": [list(pair) for pair in level.layout.connections],
+        "locks": [{"room": room, "key": key} for room, key in level.layout.locks.items()],
+        "rules": level.layout.rules,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="10x10", help="rooms as ROWSxCOLS")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--items", type=int, default=None)
+    parser.add_argument("--locks", type=int, default=0)
+    parser.add_argument("--loops", type=float, default=0.1,
+                        help="fraction of the non-tree neighbour pairs that also get a door")
+    parser.add_argument("--room-size", type=int, default=10)
+    parser.add_argument("--name", default=None)
+    parser.add_argument("--out", default=None, help="write a level file here")
+    args = parser.parse_args()
+
+    rows, cols = (int(n) for n in args.size.lower().split("x"))
+    start = time.perf_counter()
+    level = generate(rows, cols, args.seed, args.items, args.locks, args.loops,
+                     args.room_size, name=args.name)
+    elapsed = time.perf_counter() - start
+    print(f"{level.name}: {len(level.rooms)} rooms, {len(level.layout.connections)} doors, "
+          f"{level.total_items} items, {len(level.layout.locks)} locks, "
+          f"{level.rows}x{level.cols} tiles in {elapsed:.3f}s")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(to_spec(level, cols), f)
+
+
+if __name__ == "__main__":
+    main()
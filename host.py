@@ -0,0 +1,244 @@
+"""Run many game sessions on one asyncio event loop.
+
+    python host.py --sessions 300 --ticks 600
+
+Every session is a RoomGame from RoomGameV3 (or V2) wired to a transport
+instead of its own BRIDGES connection and start() loop. Level data (room
+positions, the layout and door tables, the room list) is loaded once per
+process and shared; a session holds only its engine, its frame buffers
+and its input. The host ticks every session once per frame, the same
+input -> game_loop -> send order NonBlockingGame.start() uses, and yields
+to the event loop between batches so transports get to run.
+
+LocalTransport is an in-process stand-in for the BRIDGES side: it keeps
+the grid the game drew and plays back scripted key presses.
+"""
+import argparse
+import asyncio
+import io
+import contextlib
+import time
+import tracemalloc
+from functools import lru_cache
+
+import numpy as np
+from bridges.non_blocking_game import NonBlockingGame
+
+import batch
+import RoomGameV2
+import RoomGameV3
+
+GAMES = {"v2": RoomGameV2, "v3": RoomGameV3}
+KEYS = ["up", "down", "left", "right"]
+
+
+class TransportGrid(NonBlockingGame):
+    """NonBlockingGame that draws into self.transport instead of a socket.
+
+    The one stub for a BRIDGES connection: the host, benchmark.py and
+    stress.py all run games on it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.transport = None
+
+    def set_bg_color(self, row, col, color):
+        self.transport.set_bg_color(row, col, color)
+
+    def draw_symbol(self, row, col, symbol, color):
+        self.transport.draw_symbol(row, col, symbol, color)
+
+    def key_up(self):
+        return self.transport.key_pressed("up")
+
+    def key_down(self):
+        return self.transport.key_pressed("down")
+
+    def key_left(self):
+        return self.transport.key_pressed("left")
+
+    def key_right(self):
+        return self.transport.key_pressed("right")
+
+
+@lru_cache(maxsize=None)
+def hosted_class(module):
+    """module.RoomGame drawing through a transport; one class per game module."""
+    return type("Hosted" + module.__name__, (module.RoomGame, TransportGrid), {})
+
+
+class LocalTransport:
+    """In-process stand-in for a player's BRIDGES connection.
+
+    inputs is the script of key presses, one direction (or None) per tick,
+    or a tuple of directions pressed within one tick; the session closes
+    when it runs out. bg, symbol and symbol_color hold the enum values the
+    game last drew in each cell.
+    """
+
+    def __init__(self, inputs=(), rows=32, cols=32):
+        self.inputs = iter(inputs)
+        self.pressed = None
+        self.burst = ()
+        self.bg = np.zeros((rows, cols), dtype=np.int16)
+        self.symbol = np.zeros((rows, cols), dtype=np.int16)
+        self.symbol_color = np.zeros((rows, cols), dtype=np.int16)
+        self.writes = 0
+        self.frames = 0
+        self.closed = False
+
+    def begin_tick(self):
+        direction = next(self.inputs, StopIteration)
+        self.pressed = None
+        self.burst = ()
+        if direction is StopIteration:
+            self.closed = True
+        elif isinstance(direction, tuple):
+            self.burst = direction  # queued by the session, not held
+        elif direction is not None:
+            self.pressed = KEYS[direction]
+
+    def key_pressed(self, key):
+        return self.pressed == key
+
+    def set_bg_color(self, row, col, color):
+        self.writes += 1
+        self.bg[row, col] = color.value
+
+    def draw_symbol(self, row, col, symbol, color):
+        self.writes += 1
+        self.symbol[row, col] = symbol.value
+        self.symbol_color[row, col] = color.value
+
+    def end_frame(self):
+        self.frames += 1
+
+
+class Session:
+    __slots__ = ("session_id", "game", "transport", "ticks", "done")
+
+    def __init__(self, session_id, game, transport):
+        self.session_id = session_id
+        self.game = game
+        self.transport = transport
+        self.ticks = 0
+        self.done = False
+
+    @property
+    def finished(self):
+        return self.done or self.transport.closed
+
+    def tick(self):
+        self.transport.begin_tick()
+        if self.transport.closed:
+            return
+        for direction in self.transport.burst:
+            self.game.queue_key(KEYS[direction])
+        # A won game gets one more frame to draw its win screen.
+        self.done = self.game.game_over
+        self.game.game_loop()
+        self.transport.end_frame()
+        self.ticks += 1
+
+
+class SessionHost:
+    """Ticks every open session once per frame on the running event loop.
+
+    With fps set, frames are paced to that rate; otherwise the host runs
+    as fast as the sessions allow. batch sessions are ticked between
+    yields to the event loop.
+    """
+
+    def __init__(self, game="v3", fps=None, batch=64):
+        self.module = GAMES[game]
+        self.fps = fps
+        self.batch = batch
+        self.sessions = {}
+        self.finished = []
+        self.frames = 0
+        self._next_id = 0
+
+    def open(self, transport):
+        game = hosted_class(self.module)(0, "host", f"session-{self._next_id}")
+        game.transport = transport
+        session = Session(self._next_id, game, transport)
+        self.sessions[session.session_id] = session
+        self._next_id += 1
+        return session
+
+    def close(self, session_id):
+        session = self.sessions.pop(session_id)
+        self.finished.append(session)
+        return session
+
+    async def run(self, frames=None):
+        """Tick sessions until all have finished or frames frames have run."""
+        loop = asyncio.get_running_loop()
+        frame_time = 1 / self.fps if self.fps else 0
+        next_frame = loop.time()
+        while self.sessions and (frames is None or self.frames < frames):
+            sessions = list(self.sessions.values())
+            for start in range(0, len(sessions), self.batch):
+                for session in sessions[start:start + self.batch]:
+                    session.tick()
+                    if session.finished:
+                        self.close(session.session_id)
+                await asyncio.sleep(0)
+            self.frames += 1
+            if frame_time:
+                next_frame += frame_time
+                await asyncio.sleep(max(0, next_frame - loop.time()))
+
+
+async def _demo(game, sessions, ticks, fps, idle=0.0):
+    host = SessionHost(game, fps=fps)
+    for n in range(sessions):
+        if n < sessions * idle:
+            inputs = [None] * ticks  # left open with nobody playing
+        else:
+            inputs = batch.random_walk(f"host:{n}", ticks)
+        host.open(LocalTransport(inputs))
+    start = time.perf_counter()
+    await host.run()
+    return host, time.perf_counter() - start
+
+
+def session_memory(game, sessions=50, frames=60):
+    """Bytes allocated per session after a few frames, transports included."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    host = SessionHost(game)
+    for n in range(sessions):
+        host.open(LocalTransport(batch.random_walk(f"memory:{n}", frames)))
+    asyncio.run(host.run(frames))
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--game", default="v3", choices=sorted(GAMES))
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--fps", type=float, default=None)
+    parser.add_argument("--idle", type=float, default=0.0,
+                        help="fraction of sessions that never press a key")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):  # pickup messages from every session
+        host, elapsed = asyncio.run(_demo(args.game, args.sessions, args.ticks, args.fps,
+                                             args.idle))
+        memory = session_memory(args.game)
+
+    ticks = sum(session.ticks for session in host.finished)
+    print(f"sessions: {len(host.finished)}")
+    print(f"won: {sum(1 for session in host.finished if session.game.game_over)}")
+    skipped = sum(session.game.scheduler.skipped for session in host.finished)
+    print(f"session ticks per second: {ticks / elapsed:.0f}")
+    print(f"idle ticks skipped: {skipped / ticks:.1%}")
+    print(f"memory per session: {memory / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
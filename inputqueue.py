@@ -0,0 +1,85 @@
+"""Key events queued between the grid and the engine.
+
+Polling the grid yields at most one held key per tick, but events can
+also be pushed straight in: a bot, or a host relaying a burst of key
+presses from a client. Every event is stamped on arrival. drain() hands
+out up to budget of them per tick, oldest first, and rendered() records
+how long each drained event waited for the frame that shows its move.
+
+A held key is polled again every tick. While an event for that same key
+is still waiting, the repeat adds nothing and is coalesced into it.
+Pushed events are never coalesced: three presses of right are three
+moves. Once capacity events are waiting, new ones are dropped and
+counted.
+"""
+import time
+from collections import deque
+
+from profiler import percentile
+
+
+class InputQueue:
+    def __init__(self, budget=4, capacity=64, window=1000, clock=time.perf_counter_ns):
+        self.budget = budget
+        self.capacity = capacity
+        self.clock = clock
+        self.events = deque()           # (direction, arrival time in ns)
+        self.drained = []               # arrival times of moves not yet rendered
+        self.latency = deque(maxlen=window)  # ns from arrival to render, per move
+        self.received = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.events)
+
+    def push(self, direction, repeat=False, timestamp=None):
+        """Queue a move; return False if it was coalesced or dropped.
+
+        repeat marks a key that was already held on the previous poll.
+        """
+        self.received += 1
+        if repeat and self.events and self.events[-1][0] == direction:
+            self.coalesced += 1
+            return False
+        if len(self.events) >= self.capacity:
+            self.dropped += 1
+            return False
+        self.events.append((direction, self.clock() if timestamp is None else timestamp))
+        return True
+
+    def drain(self):
+        """The directions to move this tick, at most budget of them."""
+        events = self.events
+        moves = []
+        for _ in range(min(self.budget, len(events))):
+            direction, arrived = events.popleft()
+            moves.append(direction)
+            self.drained.append(arrived)
+        return moves
+
+    def rendered(self):
+        """The frame showing every drained move has gone out."""
+        if self.drained:
+            now = self.clock()
+            self.latency.extend(now - arrived for arrived in self.drained)
+            self.drained.clear()
+
+    def clear(self):
+        self.events.clear()
+        self.drained.clear()
+
+    def report(self):
+        ordered = sorted(self.latency)
+        to_us = lambda ns: None if ns is None else round(ns / 1000, 1)
+        return {
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "waiting": len(self.events),
+            "moves": len(ordered),
+            "p50_us": to_us(percentile(ordered, 0.50)),
+            "p95_us": to_us(percentile(ordered, 0.95)),
+            "p99_us": to_us(percentile(ordered, 0.99)),
+            "max_us": to_us(ordered[-1]) if ordered else None,
+        }
@@ -0,0 +1,111 @@
+import numpy as np
+
+from doorgraph import DoorGraph
+from rules import compile_rules
+
+WALL = -1
+DOOR = -2  # door number d is stored as DOOR - d
+# Part of every cache key (see levels.load_level): bump it whenever a change
+# here, in rules.py or in doorgraph.py compiles the same file differently.
+COMPILER_VERSION = 2
+
+
+class Layout:
+    """Cell lookup tables for a grid of rooms, built once at startup.
+
+    cells[r, c] holds the room index of a room tile, WALL, or DOOR - d for
+    a tile of door d (connections[d]). locks maps a locked room to the room
+    whose item is its key, and rules lists any further rules (see rules.py);
+    both compile into gates, and gated rooms and doors start unwalkable.
+    graph is the matching DoorGraph. compiled takes (cells, walkable, doors)
+    from an earlier build (see levelcache) instead of building them again.
+    entry is None unless the level has one-way doors; then it holds the
+    room each one-way door tile may be entered from, and -1 elsewhere.
+    """
+
+    def __init__(self, rows, cols, room_positions, room_size, connections, locks=None,
+                 compiled=None, rules=()):
+        self.rows = rows
+        self.cols = cols
+        self.room_positions = list(room_positions)
+        self.room_size = room_size
+        self.connections = [tuple(pair) for pair in connections]
+        self.locks = dict(locks or {})
+        self.rules = list(rules)
+        self.gates = compile_rules(len(self.room_positions), self.connections, self.locks,
+                                   self.rules)
+
+        if compiled is not None:
+            self.cells, self.walkable, self.doors = compiled
+            self.graph = DoorGraph(len(self.room_positions), self.connections, self.doors,
+                                   self.gates)
+            self.entry = self._entry_tiles()
+            return
+
+        self.cells = np.full((rows, cols), WALL, dtype=np.int32)
+        for idx, (top, left) in enumerate(self.room_positions):
+            self.cells[top:top + room_size, left:left + room_size] = idx
+        self.doors = []
+        for door, (a, b) in enumerate(self.connections):
+            tiles = self.door_tiles(a, b)
+            for r, c in tiles:
+                self.cells[r, c] = DOOR - door
+            self.doors.append(tiles)
+        self.graph = DoorGraph(len(self.room_positions), self.connections, self.doors,
+                               self.gates)
+        self.entry = self._entry_tiles()
+
+        self.walkable = self.cells != WALL
+        for room in self.graph.locked_rooms:
+            top, left = self.room_positions[room]
+            self.walkable[top:top + room_size, left:left + room_size] = False
+        for door, tiles in enumerate(self.doors):
+            if door not in self.graph.initial_doors:
+                for r, c in tiles:
+                    self.walkable[r, c] = False
+
+    def _entry_tiles(self):
+        if not self.gates.one_way:
+            return None
+        entry = np.full((self.rows, self.cols), -1, dtype=np.int32)
+        for door, room in enumerate(self.gates.door_entry):
+            if room >= 0:
+                for r, c in self.doors[door]:
+                    entry[r, c] = room
+        return entry
+
+    def door_tiles(self, a, b):
+        top_a, left_a = self.room_positions[a]
+        top_b, left_b = self.room_positions[b]
+        if top_a == top_b:
+            # Horizontal neighbours: 2 tiles down the wall between them.
+            row = top_a + self.room_size // 2
+            col = min(left_a, left_b) + self.room_size
+            return [(row, col), (row + 1, col)]
+        if left_a == left_b:
+            # Vertical neighbours: 2 tiles across the wall between them.
+            row = min(top_a, top_b) + self.room_size
+            col = left_a + self.room_size // 2
+            return [(row, col), (row, col + 1)]
+        raise ValueError(f"Rooms {a} and {b} are not neighbours")
+
+    def room_at(self, r, c):
+        """Room index at (r, c), or None for walls, doors and off-grid cells."""
+        if 0 <= r < self.rows and 0 <= c < self.cols:
+            cell = self.cells.item(r, c)
+            if cell >= 0:
+                return cell
+        return None
+
+    def new_walkable(self):
+        """A fresh walkability mask for one game; update it with open()."""
+        return self.walkable.copy()
+
+    def open(self, walkable, rooms, doors):
+        """Make rooms and doors (as opened by a DoorState) walkable."""
+        for room in rooms:
+            top, left = self.room_positions[room]
+            walkable[top:top + self.room_size, left:left + self.room_size] = True
+        for door in doors:
+            for r, c in self.doors[door]:
+                walkable[r, c] = True
@@ -0,0 +1,82 @@
+"""Compiled layout arrays on disk, read back through mmap.
+
+A cache file holds a Layout's cells, base walkability and door tiles
+behind a fixed header. load() maps the file and wraps numpy arrays around
+the mapping without copying, so a level of any size is ready as soon as
+the file is open. Files are named by a hash of the level file they were
+compiled from and layout.COMPILER_VERSION (see levels.load_level), so
+neither an edited level nor a changed compiler picks up a stale cache.
+"""
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = b"RGL1"
+HEADER = struct.Struct("<4sIIII")  # magic, rows, cols, doors, door tiles
+
+
+def _padded(size):
+    # Keep every array 4-byte aligned in the file.
+    return (size + 3) & ~3
+
+
+def save(path, layout):
+    """Write layout's arrays to path, replacing any existing file atomically."""
+    counts = np.array([len(tiles) for tiles in layout.doors], dtype=np.int32)
+    tiles = np.array([tile for tiles in layout.doors for tile in tiles],
+                     dtype=np.int32).reshape(-1, 2)
+    cells = np.ascontiguousarray(layout.cells, dtype=np.int32)
+    walkable = np.ascontiguousarray(layout.walkable, dtype=np.uint8)
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, layout.rows, layout.cols, len(counts), len(tiles)))
+            f.write(cells.tobytes())
+            f.write(walkable.tobytes().ljust(_padded(walkable.size), b"\0"))
+            f.write(counts.tobytes())
+            f.write(tiles.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load(path):
+    """(cells, walkable, doors) mapped from path, or None if there is no usable file.
+
+    The arrays are read-only views of the mapping; Layout only ever copies
+    walkable, so nothing writes through them.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # missing, unreadable or empty
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, rows, cols, door_count, tile_count = HEADER.unpack_from(data)
+    offset = HEADER.size
+    size = rows * cols
+    expected = offset + 4 * size + _padded(size) + 4 * door_count + 8 * tile_count
+    if magic != MAGIC or len(data) != expected:
+        return None
+
+    cells = np.frombuffer(data, dtype=np.int32, count=size, offset=offset).reshape(rows, cols)
+    offset += 4 * size
+    walkable = np.frombuffer(data, dtype=np.bool_, count=size, offset=offset).reshape(rows, cols)
+    offset += _padded(size)
+    counts = np.frombuffer(data, dtype=np.int32, count=door_count, offset=offset).tolist()
+    offset += 4 * door_count
+    tiles = np.frombuffer(data, dtype=np.int32, count=2 * tile_count, offset=offset).tolist()
+
+    pairs = list(zip(tiles[0::2], tiles[1::2]))
+    doors = []
+    start = 0
+    for count in counts:
+        doors.append(pairs[start:start + count])
+        start += count
+    return cells, walkable, doors
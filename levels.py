@@ -0,0 +1,143 @@
+"""Level content, loaded from the JSON files in level_data/.
+
+A level file names its rooms (and their items), the grid and room sizes,
+the doors as pairs of room indices and the locks as {"room", "key"}
+pairs, where key is the room whose item opens room. Optional "rules"
+add multi-key locks, locked doors and one-way doors (see rules.py).
+Rules are checked when the file is loaded. The compiled layout
+of each file is cached in level_data/.cache, keyed by the file's hash.
+LEVELS names every file but only loads one when it is first looked up,
+so starting a game costs one level, not all of them.
+"""
+import glob
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+
+import levelcache
+from layout import COMPILER_VERSION, Layout
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "level_data")
+CACHE_DIR = os.path.join(DATA_DIR, ".cache")
+
+
+class Level:
+    """Immutable level content: rooms on a square grid joined by doors.
+
+    Rooms are laid out row by row, room_size tiles wide with wall_size
+    tiles of wall between them. The layout index is built once here (or
+    handed in by load_level) and shared by every game playing the level.
+    """
+
+    def __init__(self, name, rooms, grid_size, room_size, connections, locks=None,
+                 wall_size=1, rooms_per_row=3, layout=None, rules=()):
+        self.name = name
+        self.rooms = rooms
+        self.grid_size = grid_size
+        self.rows = grid_size
+        self.cols = grid_size
+        self.room_size = room_size
+        self.wall_size = wall_size
+        if layout is None:
+            self.room_positions = build_room_positions(len(rooms), rooms_per_row, room_size,
+                                                       wall_size)
+            layout = Layout(self.rows, self.cols, self.room_positions, room_size,
+                            connections, locks, rules=rules)
+        else:
+            self.room_positions = layout.room_positions
+        self.layout = layout
+        self.total_items = sum(1 for room in rooms if room["item"])
+        top, left = self.room_positions[0]
+        self.spawn = (top + 1, left + 1)
+
+
+def build_room_positions(count, rooms_per_row, room_size, wall_size):
+    positions = []
+    for idx in range(count):
+        row, col = divmod(idx, rooms_per_row)
+        top = row * (room_size + wall_size)
+        left = col * (room_size + wall_size)
+        positions.append((top, left))
+    return positions
+
+
+def load_level(path, cache_dir=CACHE_DIR):
+    """Read the level file at path, reusing its compiled layout from cache_dir.
+
+    Pass cache_dir=None to always compile. A cache that can't be written
+    (read-only checkout, say) is skipped without complaint.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    spec = json.loads(raw)
+    name = spec["name"]
+    rooms = spec["rooms"]
+    connections = [tuple(door) for door in spec["doors"]]
+    locks = {lock["room"]: lock["key"] for lock in spec.get("locks", [])}
+    for room, key in locks.items():
+        if not (0 <= room < len(rooms) and 0 <= key < len(rooms)) or not rooms[key]["item"]:
+            raise ValueError(f"{path}: lock on room {room} needs the item in room {key}")
+    rules = spec.get("rules", [])
+    for rule in rules:
+        for key in rule.get("keys", ()):
+            if not (0 <= key < len(rooms)) or not rooms[key]["item"]:
+                raise ValueError(f"{path}: rule {rule} needs the item in room {key}")
+    grid_size = spec["grid_size"]
+    room_size = spec["room_size"]
+    wall_size = spec.get("wall_size", 1)
+    rooms_per_row = spec.get("rooms_per_row", 3)
+
+    positions = build_room_positions(len(rooms), rooms_per_row, room_size, wall_size)
+    compiled = None
+    cache_path = None
+    if cache_dir:
+        version = COMPILER_VERSION.to_bytes(4, "little")
+        key = hashlib.sha256(levelcache.MAGIC + version + raw).hexdigest()
+        cache_path = os.path.join(cache_dir, f"{name}-{key[:32]}.bin")
+        compiled = levelcache.load(cache_path)
+    try:
+        layout = Layout(grid_size, grid_size, positions, room_size, connections, locks,
+                        compiled=compiled, rules=rules)
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+    if cache_path and compiled is None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            levelcache.save(cache_path, layout)
+        except OSError:
+            pass
+    return Level(name, rooms, grid_size, room_size, connections, locks,
+                 wall_size=wall_size, rooms_per_row=rooms_per_row, layout=layout)
+
+
+class LevelFiles(Mapping):
+    """The *.json levels in a directory by file name (without .json, and the
+    same as the level's own name), each loaded on first lookup and kept."""
+
+    def __init__(self, directory=DATA_DIR, cache_dir=CACHE_DIR):
+        self.paths = {os.path.splitext(os.path.basename(path))[0]: path
+                      for path in sorted(glob.glob(os.path.join(directory, "*.json")))}
+        self.cache_dir = cache_dir
+        self._loaded = {}
+
+    def __getitem__(self, name):
+        if name not in self._loaded:
+            self._loaded[name] = load_level(self.paths[name], self.cache_dir)
+        return self._loaded[name]
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+
+LEVELS = LevelFiles()
+
+
+def __getattr__(name):
+    # levels.V2 and levels.V3 load on first use, like the rest of LEVELS.
+    if name in ("V2", "V3"):
+        return LEVELS[name.lower()]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
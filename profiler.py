@@ -0,0 +1,166 @@
+"""Opt-in per-stage timing for RoomGame.game_loop.
+
+    game = RoomGame(1, user, apikey, profile_to="profile.json")
+
+attach() swaps the profiled methods for timed wrappers on the one game
+instance, so a game that is not profiled runs the plain methods and pays
+nothing. Every frame, each stage's time (perf_counter_ns) and writes are
+added up and pushed into a rolling window. p50/p95/p99 over the window
+are dumped as JSON every dump_every frames and when the program exits.
+
+Two write counts are kept per stage: cells drawn into the game's frame
+buffers, and cells actually sent to the grid (set_bg_color and
+draw_symbol on the game itself, which only the flush stage does).
+"""
+import atexit
+import json
+import time
+from collections import deque
+
+FRAME = "frame"  # the whole game_loop call
+# RoomGame methods timed as stages of game_loop.
+GAME_STAGES = ("draw_walls", "draw_rooms", "draw_scene", "poll_keys", "handle_input",
+               "draw_player", "display_score", "display_room_name", "show_win_screen")
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class StageStats:
+    """The last window per-frame samples of one stage."""
+
+    def __init__(self, window):
+        self.times = deque(maxlen=window)       # ns spent in the stage per frame
+        self.drawn = deque(maxlen=window)       # frame buffer cells drawn per frame
+        self.grid_writes = deque(maxlen=window)  # grid calls per frame
+        self.calls = 0
+
+    def report(self):
+        ordered = sorted(self.times)
+        frames = len(ordered)
+        to_us = lambda ns: None if ns is None else round(ns / 1000, 1)
+        return {
+            "calls": self.calls,
+            "frames": frames,
+            "mean_us": to_us(sum(ordered) / frames) if frames else None,
+            "p50_us": to_us(percentile(ordered, 0.50)),
+            "p95_us": to_us(percentile(ordered, 0.95)),
+            "p99_us": to_us(percentile(ordered, 0.99)),
+            "max_us": to_us(ordered[-1]) if frames else None,
+            "cells_drawn_per_frame": sum(self.drawn) / frames if frames else 0,
+            "grid_writes_per_frame": sum(self.grid_writes) / frames if frames else 0,
+        }
+
+
+class FrameProfiler:
+    def __init__(self, path=None, window=1000, dump_every=600):
+        self.path = path
+        self.window = window
+        self.dump_every = dump_every
+        self.stats = {}
+        self.frames = 0
+        # Other reports to dump alongside the stages: name -> callable.
+        self.sources = {}
+        # Totals for the frame in progress, keyed by stage.
+        self._time = {}
+        self._drawn = {}
+        self._grid = {}
+        self._stage = FRAME
+        if path:
+            atexit.register(self.dump)
+
+    def attach(self, game, stages, buffers=()):
+        """Time game.game_loop and each (name, owner, method name) in stages.
+
+        buffers are the FrameBuffers the stages draw into; their writes are
+        counted against whichever stage is running.
+        """
+        self._wrap_stage(FRAME, game, "game_loop", self._end_frame)
+        for name, owner, attr in stages:
+            self._wrap_stage(name, owner, attr)
+        self._count_calls(game, "set_bg_color", self._grid, lambda *args: 1)
+        self._count_calls(game, "draw_symbol", self._grid, lambda *args: 1)
+        for buffer in buffers:
+            self._count_calls(buffer, "set_bg_color", self._drawn, lambda *args: 1)
+            self._count_calls(buffer, "draw_symbol", self._drawn, lambda *args: 1)
+            self._count_calls(buffer, "fill", self._drawn,
+                              lambda top, left, height, width, color: height * width)
+            self._count_calls(buffer, "paste", self._drawn,
+                              lambda top, left, source, source_top, source_left, height, width:
+                              height * width)
+            self._count_calls(buffer, "clear", self._drawn, self._cleared(buffer))
+        return self
+
+    @staticmethod
+    def _cleared(buffer):
+        """Cells a call to buffer.clear() covers, with its defaults filled in."""
+        def cells(top=0, left=0, height=None, width=None):
+            return ((buffer.rows - top if height is None else height)
+                    * (buffer.cols - left if width is None else width))
+        return cells
+
+    def _wrap_stage(self, name, owner, attr, after=None):
+        method = getattr(owner, attr)
+        stats = self.stats.setdefault(name, StageStats(self.window))
+        clock = time.perf_counter_ns
+        totals = self._time
+
+        def timed(*args, **kwargs):
+            outer = self._stage
+            self._stage = name
+            stats.calls += 1
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                totals[name] = totals.get(name, 0) + clock() - start
+                self._stage = outer
+                if after is not None:
+                    after()
+
+        setattr(owner, attr, timed)
+
+    def _count_calls(self, owner, attr, counts, cells):
+        method = getattr(owner, attr)
+
+        def counted(*args, **kwargs):
+            stage = self._stage
+            counts[stage] = counts.get(stage, 0) + cells(*args, **kwargs)
+            return method(*args, **kwargs)
+
+        setattr(owner, attr, counted)
+
+    def _end_frame(self):
+        for name, ns in self._time.items():
+            stats = self.stats[name]
+            stats.times.append(ns)
+            stats.drawn.append(self._drawn.get(name, 0))
+            stats.grid_writes.append(self._grid.get(name, 0))
+        # Writes made outside any stage still count towards the frame.
+        frame = self.stats[FRAME]
+        frame.drawn[-1] = sum(self._drawn.values())
+        frame.grid_writes[-1] = sum(self._grid.values())
+        self._time.clear()
+        self._drawn.clear()
+        self._grid.clear()
+        self.frames += 1
+        if self.path and self.dump_every and self.frames % self.dump_every == 0:
+            self.dump()
+
+    def report(self):
+        return {
+            "frames": self.frames,
+            "window": self.window,
+            "stages": {name: stats.report() for name, stats in self.stats.items()},
+            **{name: report() for name, report in self.sources.items()},
+        }
+
+    def dump(self, path=None):
+        path = path or self.path
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
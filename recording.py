@@ -0,0 +1,178 @@
+"""Record the per-tick input of a session and replay it headless.
+
+    python recording.py session1.rgi session2.rgi ...
+
+A recording stores the level name, the number of ticks, a digest of the
+final game state and the inputs. Replaying runs the inputs straight
+through a GameEngine, with no frame clock, and checks the digest.
+
+Inputs are packed into a byte stream:
+
+    1nnnnnnn    n + 1 idle ticks (longer idle spells take several bytes)
+    01aabbcc    three moves a, b, c
+    0001aabb    two moves a, b
+    000001aa    one move a
+
+so steady play costs 2 bits per move plus the tag, and idle time almost
+nothing.
+"""
+import argparse
+import hashlib
+import struct
+import time
+
+import levels
+from engine import GameEngine
+
+MAGIC = b"RGI1"
+HEADER = struct.Struct("<4sBI8s")  # magic, level name length, ticks, digest
+MAX_IDLE_RUN = 128
+
+
+def state_digest(engine):
+    """8-byte digest of the engine's state, moves included."""
+    state = engine.snapshot()
+    key = state.pack(len(engine.level.rooms))
+    data = key.to_bytes((key.bit_length() + 7) // 8 or 1, "little")
+    return hashlib.blake2b(data + state.moves.to_bytes(8, "little"), digest_size=8).digest()
+
+
+def encode_inputs(inputs):
+    out = bytearray()
+    moves = []
+    idle = 0
+
+    def flush_moves():
+        while moves:
+            group, rest = moves[:3], moves[3:]
+            if len(group) == 3:
+                out.append(0x40 | group[0] << 4 | group[1] << 2 | group[2])
+            elif len(group) == 2:
+                out.append(0x10 | group[0] << 2 | group[1])
+            else:
+                out.append(0x04 | group[0])
+            moves[:] = rest
+
+    for direction in inputs:
+        if direction is None:
+            if moves:
+                flush_moves()
+            idle += 1
+            if idle == MAX_IDLE_RUN:
+                out.append(0x80 | idle - 1)
+                idle = 0
+        else:
+            if idle:
+                out.append(0x80 | idle - 1)
+                idle = 0
+            moves.append(direction)
+            if len(moves) == 3:
+                flush_moves()
+    flush_moves()
+    if idle:
+        out.append(0x80 | idle - 1)
+    return bytes(out)
+
+
+def decode_inputs(data):
+    inputs = []
+    for byte in data:
+        if byte & 0x80:
+            inputs.extend([None] * ((byte & 0x7F) + 1))
+        elif byte & 0x40:
+            inputs += (byte >> 4 & 3, byte >> 2 & 3, byte & 3)
+        elif byte & 0x10:
+            inputs += (byte >> 2 & 3, byte & 3)
+        elif byte & 0x04:
+            inputs.append(byte & 3)
+        else:
+            raise ValueError(f"Bad input byte {byte:#04x}")
+    return inputs
+
+
+class Recording:
+    def __init__(self, level_name, inputs, digest):
+        self.level_name = level_name
+        self.inputs = inputs    # one entry per tick: a direction or None
+        self.digest = digest    # state_digest() at the end of the session
+
+    def to_bytes(self):
+        name = self.level_name.encode()
+        return (HEADER.pack(MAGIC, len(name), len(self.inputs), self.digest)
+                + name + encode_inputs(self.inputs))
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, name_length, ticks, digest = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not an input recording")
+        start = HEADER.size
+        name = data[start:start + name_length].decode()
+        inputs = decode_inputs(data[start + name_length:])
+        if len(inputs) != ticks:
+            raise ValueError(f"Recording says {ticks} ticks but holds {len(inputs)}")
+        return cls(name, inputs, digest)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+class InputRecorder:
+    """Collects one input per tick; RoomGame feeds it from game_loop."""
+
+    def __init__(self, level):
+        self.level = level
+        self.inputs = []
+
+    def record(self, direction):
+        self.inputs.append(direction)
+
+    def finish(self, engine):
+        return Recording(self.level.name, list(self.inputs), state_digest(engine))
+
+
+def replay(recording):
+    """Run a recording through a fresh engine as fast as possible; return the engine."""
+    engine = GameEngine(levels.LEVELS[recording.level_name])
+    move = engine.move
+    for direction in recording.inputs:
+        if direction is not None:
+            move(direction)
+    return engine
+
+
+def verify(recording):
+    """True if replaying the recording ends in the state it was saved with."""
+    return state_digest(replay(recording)) == recording.digest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    failed = 0
+    ticks = 0
+    start = time.perf_counter()
+    for path in args.paths:
+        recording = Recording.load(path)
+        ticks += len(recording.inputs)
+        if not verify(recording):
+            failed += 1
+            print(f"{path}: final state does not match")
+    elapsed = time.perf_counter() - start
+    print(f"{len(args.paths) - failed}/{len(args.paths)} recordings match")
+    if elapsed:
+        print(f"ticks per second: {ticks / elapsed:.0f}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
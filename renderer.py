@@ -0,0 +1,53 @@
+import numpy as np
+from bridges.named_symbol import NamedSymbol
+from bridges.named_color import NamedColor
+from framebuffer import FrameBuffer, TRANSPARENT
+
+
+class Renderer:
+    """Keeps the last frame sent to a NonBlockingGame and only pushes damage.
+
+    Drawing goes into transparent FrameBuffer layers (bottom to top). On
+    commit() the layers are composited into one frame, which is diffed
+    against the last committed frame so only changed cells reach the grid.
+    Frames where no layer changed skip the composite altogether.
+    """
+
+    def __init__(self, game, rows, cols, layers=1):
+        self.game = game
+        self.rows = rows
+        self.cols = cols
+        self.layers = [FrameBuffer(rows, cols) for _ in range(layers)]
+        self.frame = FrameBuffer(rows, cols)
+        self.cells_written = 0      # cells pushed by the last commit
+        self.total_cells_written = 0
+        self.frames = 0
+
+    def invalidate(self):
+        self.frame.invalidate()
+        self.layers[0].dirty = True
+
+    def commit(self):
+        written = 0
+        if any(layer.dirty for layer in self.layers):
+            frame = self.frame
+            base = self.layers[0]
+            np.copyto(frame.bg, base.bg)
+            np.copyto(frame.symbol, base.symbol)
+            np.copyto(frame.symbol_color, base.symbol_color)
+            for layer in self.layers[1:]:
+                np.copyto(frame.bg, layer.bg, where=layer.bg != TRANSPARENT)
+                drawn = layer.symbol != TRANSPARENT
+                np.copyto(frame.symbol, layer.symbol, where=drawn)
+                np.copyto(frame.symbol_color, layer.symbol_color, where=drawn)
+            frame.bg[frame.bg == TRANSPARENT] = NamedColor.black.value
+            blank = frame.symbol == TRANSPARENT
+            frame.symbol[blank] = NamedSymbol.none.value
+            frame.symbol_color[blank] = frame.bg[blank]
+            written = frame.flush(self.game)
+            for layer in self.layers:
+                layer.dirty = False
+        self.cells_written = written
+        self.total_cells_written += written
+        self.frames += 1
+        return written
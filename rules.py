@@ -0,0 +1,108 @@
+"""Level rules (locks, keys, one-way doors) compiled to bitmask tables.
+
+A level file lists its rules as dicts:
+
+    {"type": "lock", "room": 8, "keys": [5]}
+        room 8 stays shut until the items in rooms 5 (and any other key
+        rooms listed) have all been collected
+    {"type": "door", "door": [2, 5], "keys": [3]}
+        the door between rooms 2 and 5 stays shut until the item in room 3
+        is collected, whatever the rooms on either side
+    {"type": "one_way", "door": [4, 7]}
+        the door between rooms 4 and 7 can only be entered from room 4
+
+The older "locks" entries ({"room": r, "key": k}) are room locks with a
+single key. A door is open once both its rooms are and its own keys are
+held.
+
+compile_rules() turns the rules into Gates: for every room and door the
+mask of key rooms it needs, in the same bit layout as the engine's
+item_mask, so a gate is open exactly when need & ~item_mask == 0. Picking
+up an item only re-checks the gates that list it as a key, and a move
+looks up nothing but the walkability array (plus the entry room of a
+one-way door), however many rules a level has.
+"""
+
+RULE_TYPES = ("lock", "door", "one_way")
+
+
+def _mask(rooms):
+    mask = 0
+    for room in rooms:
+        mask |= 1 << room
+    return mask
+
+
+class Gates:
+    """A level's rules, compiled.
+
+    room_need[room] and door_need[door] are key masks (0: open from the
+    start); door_need holds the door's own keys only. door_entry[door] is
+    the only room a one-way door may be entered from, or -1. by_key maps a
+    key room to the (rooms, doors) whose need includes it.
+    """
+
+    def __init__(self, room_need, door_need, door_entry):
+        self.room_need = tuple(room_need)
+        self.door_need = tuple(door_need)
+        self.door_entry = tuple(door_entry)
+        self.one_way = any(entry >= 0 for entry in self.door_entry)
+        by_key = {}
+        for kind, needs in ((0, self.room_need), (1, self.door_need)):
+            for gate, need in enumerate(needs):
+                while need:
+                    low = need & -need
+                    by_key.setdefault(low.bit_length() - 1, ([], []))[kind].append(gate)
+                    need ^= low
+        self.by_key = {key: (tuple(rooms), tuple(doors)) for key, (rooms, doors) in by_key.items()}
+        self.keys = frozenset(self.by_key)
+
+    def may_enter(self, door, room):
+        """True if door can be walked into from room."""
+        entry = self.door_entry[door]
+        return entry < 0 or entry == room
+
+    def open_rooms(self, item_mask):
+        return [room for room, need in enumerate(self.room_need) if not need & ~item_mask]
+
+    def door_open(self, door, connections, item_mask):
+        a, b = connections[door]
+        need = self.door_need[door] | self.room_need[a] | self.room_need[b]
+        return not need & ~item_mask
+
+
+def compile_rules(room_count, connections, locks=None, rules=()):
+    """Gates for a level; raises ValueError for a rule that doesn't fit it."""
+    door_of = {}
+    for door, (a, b) in enumerate(connections):
+        door_of[a, b] = door_of[b, a] = door
+    room_need = [0] * room_count
+    door_need = [0] * len(connections)
+    door_entry = [-1] * len(connections)
+
+    def check_rooms(rule, rooms):
+        for room in rooms:
+            if not 0 <= room < room_count:
+                raise ValueError(f"rule {rule} names room {room}, which doesn't exist")
+
+    def door_in(rule):
+        pair = tuple(rule.get("door", ()))
+        if pair not in door_of:
+            raise ValueError(f"rule {rule} names no door of the level")
+        return door_of[pair]
+
+    locks = [{"type": "lock", "room": room, "keys": [key]} for room, key in (locks or {}).items()]
+    for rule in locks + list(rules):
+        kind = rule.get("type")
+        if kind == "lock":
+            check_rooms(rule, [rule["room"], *rule["keys"]])
+            room_need[rule["room"]] |= _mask(rule["keys"])
+        elif kind == "door":
+            check_rooms(rule, rule["keys"])
+            door_need[door_in(rule)] |= _mask(rule["keys"])
+        elif kind == "one_way":
+            door_entry[door_in(rule)] = rule["door"][0]
+        else:
+            raise ValueError(f"rule {rule} has unknown type {kind!r}; "
+                             f"expected one of {', '.join(RULE_TYPES)}")
+    return Gates(room_need, door_need, door_entry)
@@ -0,0 +1,50 @@
+"""Which ticks of a game loop have anything to do.
+
+NonBlockingGame calls game_loop every frame whether or not anything has
+happened. A tick is due when there is input waiting, when something
+called wake() since the last due tick (the first tick always is), or
+when a deadline set with wake_in() comes round. Every other tick is
+skipped: the grid still shows exactly what that frame would draw, so the
+game does neither logic nor rendering for it.
+"""
+import heapq
+
+
+class TickScheduler:
+    def __init__(self):
+        self.tick = 0
+        self.awake = True
+        self.deadlines = []     # heap of ticks to wake at
+        self.ran = 0
+        self.skipped = 0
+
+    def wake(self):
+        """Run the next tick, e.g. after a state change made outside game_loop."""
+        self.awake = True
+
+    def wake_in(self, ticks):
+        """Run the tick ticks from the current one."""
+        heapq.heappush(self.deadlines, self.tick + ticks)
+
+    def due(self, pending=False):
+        """Advance one tick; return True if game_loop should run it.
+
+        pending says input is waiting for this tick.
+        """
+        self.tick += 1
+        deadlines = self.deadlines
+        timer = False
+        while deadlines and deadlines[0] <= self.tick:
+            heapq.heappop(deadlines)
+            timer = True
+        if pending or timer or self.awake:
+            self.awake = False
+            self.ran += 1
+            return True
+        self.skipped += 1
+        return False
+
+    @property
+    def skipped_fraction(self):
+        ticks = self.ran + self.skipped
+        return self.skipped / ticks if ticks else 0.0
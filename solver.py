@@ -0,0 +1,911 @@
+"""Shortest route through a level that picks up every item.
+
+    python solver.py --level v3
+
+The engine collects an item on the first step into its room, so the
+points a route is planned between are the spawn tile and, for every item
+room, each tile just inside one of its doors (a route can only first
+enter a room through a door). Rooms are open rectangles, so two tiles in
+or beside the same room are their Manhattan distance apart and only the
+door tiles need a graph search, done all-pairs per set of keys held. The
+level's gates (rules.Gates) keep locked rooms and doors shut until every
+key they need is held, and one-way doors are only entered from their
+entry room.
+
+The visiting order is an A* search over (items collected, tile last
+item was collected on), Held-Karp's states. Its estimate of the moves
+left comes from the shape of the maze with every gate open (WalkBound),
+so it never overestimates and the first finished route is the shortest.
+It only expands states whose route can still beat the best one, so tree
+mazes (no loops) of 6x6 rooms and 20+ items finish well under a second
+where the full table over every subset would not.
+
+Mazes with loops give a weaker estimate and the search can grow without
+limit, so it stops after SEARCH_BUDGET steps (about a second) and
+settles for a route that is short but not proven shortest
+(Solution.optimal is False). On 5x5 mazes with 20 items and 2 locks a
+loop fraction of 0.2 already hits the budget on most seeds, with routes
+up to 8% longer than the shortest; 0.3 and above hit it every time.
+
+par is the number of moves the engine needs when replaying the route,
+which for this model is the route length. --check also plays every
+reachable game state breadth first (fewest_moves) and compares; that
+is only practical on small levels.
+"""
+import argparse
+import heapq
+from itertools import permutations
+
+import numpy as np
+
+import levels
+from engine import GameEngine, UP, DOWN, LEFT, RIGHT
+from state import StateSet
+
+INF = 1 << 28
+LOOP_TARGETS = 6  # rooms and stops a search in a part with loops takes on
+SEARCH_BUDGET = 100_000  # steps search() takes before settling for a good route (about 1 s)
+STEPS = {(-1, 0): UP, (1, 0): DOWN, (0, -1): LEFT, (0, 1): RIGHT}
+
+
+class Solution:
+    def __init__(self, order, moves, inputs, par, optimal=True):
+        self.order = order      # item rooms in pickup order
+        self.moves = moves      # length of the route
+        self.inputs = inputs    # the route as engine directions
+        self.par = par          # moves the engine needs to win following the route
+        self.optimal = optimal  # False if the search ran out of budget (see search)
+
+
+class RouteGraph:
+    """Door tiles of a level, and the tiles where a route can pick up each item.
+
+    Node 0 is the spawn tile; every other node is the first tile inside an
+    item room, reached through door tile node_via[node] (or, in the spawn
+    room, by the first step away from spawn: node_via None).
+    """
+
+    def __init__(self, level):
+        self.level = level
+        layout = level.layout
+        self.gates = layout.gates
+        self.items = [idx for idx, room in enumerate(level.rooms) if room["item"]]
+
+        self.tiles = []         # door tiles
+        self.tile_door = []
+        self.room_tiles = [[] for _ in level.rooms]
+        for door, ((a, b), tiles) in enumerate(zip(layout.connections, layout.doors)):
+            for cell in tiles:
+                self.room_tiles[a].append(len(self.tiles))
+                self.room_tiles[b].append(len(self.tiles))
+                self.tiles.append(cell)
+                self.tile_door.append(door)
+
+        spawn_room = layout.room_at(*level.spawn)
+        self.cells = [level.spawn]
+        self.node_room = [spawn_room]
+        self.node_via = [None]
+        self.item_nodes = []
+        for room in self.items:
+            nodes = []
+            for tile in self.room_tiles[room]:
+                nodes.append(len(self.cells))
+                self.cells.append(self._inside(room, self.tiles[tile]))
+                self.node_room.append(room)
+                self.node_via.append(tile)
+            if room == spawn_room:
+                r, c = level.spawn
+                for cell in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                    if layout.room_at(*cell) == room:
+                        nodes.append(len(self.cells))
+                        self.cells.append(cell)
+                        self.node_room.append(room)
+                        self.node_via.append(None)
+            self.item_nodes.append(nodes)
+
+        # Items that are keys to some gate.
+        self.key_bits = 0
+        for i, room in enumerate(self.items):
+            if room in self.gates.keys:
+                self.key_bits |= 1 << i
+        self._graphs = {}
+        self._tables = {}
+
+    def _inside(self, room, cell):
+        """The tile of room nearest to cell (cell itself if it is in room)."""
+        top, left = self.level.room_positions[room]
+        size = self.level.room_size
+        return (min(max(cell[0], top), top + size - 1),
+                min(max(cell[1], left), left + size - 1))
+
+    def held(self, mask):
+        """mask over item indices as a mask over rooms, like engine.item_mask."""
+        held = 0
+        for i, room in enumerate(self.items):
+            if mask >> i & 1:
+                held |= 1 << room
+        return held
+
+    def door_graph(self, held):
+        """(edges, dist) between door tiles with the keys in held (a room mask).
+
+        edges[u, v] is the length of a walk from u to v across one room they
+        share, dist[u, v] the shortest path; INF where there is none.
+        """
+        gates = self.gates
+        connections = self.level.layout.connections
+        is_open = [not need & ~held for need in gates.room_need]
+        door_open = [gates.door_open(door, connections, held) for door in range(len(connections))]
+        count = len(self.tiles)
+        edges = np.full((count, count), INF, dtype=np.int64)
+        for room, tiles in enumerate(self.room_tiles):
+            if not is_open[room]:
+                continue
+            for u in tiles:
+                if not door_open[self.tile_door[u]]:
+                    continue
+                ur, uc = self.tiles[u]
+                for v in tiles:
+                    door = self.tile_door[v]
+                    if u != v and door_open[door] and gates.may_enter(door, room):
+                        vr, vc = self.tiles[v]
+                        edges[u, v] = min(edges[u, v], abs(ur - vr) + abs(uc - vc))
+        dist = edges.copy()
+        np.fill_diagonal(dist, 0)
+        for k in range(count):
+            np.minimum(dist, dist[:, k, None] + dist[None, k, :], out=dist)
+        return edges, np.minimum(dist, INF), is_open, door_open
+
+    def _node_to_tiles(self, node, graph):
+        """Distances from a node to every door tile: leave its room, then the door graph."""
+        _, dist, is_open, door_open = graph
+        room = self.node_room[node]
+        r, c = self.cells[node]
+        best = np.full(len(self.tiles), INF, dtype=np.int64)
+        if not is_open[room]:
+            return best
+        for tile in self.room_tiles[room]:
+            door = self.tile_door[tile]
+            if door_open[door] and self.gates.may_enter(door, room):
+                tr, tc = self.tiles[tile]
+                np.minimum(best, dist[tile] + abs(r - tr) + abs(c - tc), out=best)
+        return best
+
+    def _node_distances(self, graph):
+        """dist[u][v] between nodes: walk to v's door tile, then step in."""
+        count = len(self.cells)
+        dist = np.full((count, count), INF, dtype=np.int64)
+        via = np.array([-1 if tile is None else tile for tile in self.node_via])
+        through = via >= 0
+        for u in range(count):
+            to_tiles = self._node_to_tiles(u, graph)
+            dist[u, through] = to_tiles[via[through]] + 1
+        # The spawn room's item is taken by the first step away from spawn.
+        for v in range(count):
+            if not through[v]:
+                dist[:, v] = INF
+                dist[0, v] = 1
+        return np.minimum(dist, INF)
+
+    def graph(self, mask):
+        """door_graph() with mask's keys held, built once per set of keys."""
+        keys = mask & self.key_bits
+        if keys not in self._graphs:
+            self._graphs[keys] = self.door_graph(self.held(keys))
+        return self._graphs[keys]
+
+    def table(self, mask):
+        """Node-to-node distances (lists, for the search) with mask's keys held."""
+        keys = mask & self.key_bits
+        if keys not in self._tables:
+            self._tables[keys] = self._node_distances(self.graph(keys)).tolist()
+        return self._tables[keys]
+
+    def path(self, mask, u, v):
+        """Tiles from node u to node v with mask's keys held, excluding u's tile."""
+        tile = self.node_via[v]
+        if tile is None:
+            return [self.cells[v]]
+        graph = self.graph(mask)
+        edges, dist = graph[0], graph[1]
+        # Pick the door out of u's room that starts a shortest path to tile.
+        room = self.node_room[u]
+        r, c = self.cells[u]
+        want = self._node_to_tiles(u, graph)[tile]
+        current = next(t for t in self.room_tiles[room]
+                       if graph[3][self.tile_door[t]] and self.gates.may_enter(self.tile_door[t], room)
+                       and dist[t, tile] + abs(r - self.tiles[t][0]) + abs(c - self.tiles[t][1]) == want)
+        tiles = self._walk(self.cells[u], self.tiles[current], room)
+        while current != tile:
+            step = next(t for t in range(len(self.tiles))
+                        if edges[current, t] + dist[t, tile] == dist[current, tile])
+            shared = next(room for room in (set(self.level.layout.connections[self.tile_door[current]])
+                                            & set(self.level.layout.connections[self.tile_door[step]]))
+                          if graph[2][room] and self.gates.may_enter(self.tile_door[step], room)
+                          and self._span(current, step) == edges[current, step])
+            tiles.extend(self._walk(self.tiles[current], self.tiles[step], shared))
+            current = step
+        tiles.append(self.cells[v])
+        return tiles
+
+    def _span(self, u, v):
+        (r, c), (tr, tc) = self.tiles[u], self.tiles[v]
+        return abs(r - tr) + abs(c - tc)
+
+    def _walk(self, start, end, room):
+        """Tiles from start to end across room (each in it or beside it), excluding start."""
+        (r, c), (tr, tc) = start, end
+        if abs(r - tr) + abs(c - tc) == 1:
+            return [end]
+        tiles = []
+        # Step off the wall into the room, cross it, and step out again.
+        r2, c2 = self._inside(room, start)
+        if (r2, c2) != start:
+            tiles.append((r2, c2))
+        end_r, end_c = self._inside(room, end)
+        while r2 != end_r:
+            r2 += 1 if end_r > r2 else -1
+            tiles.append((r2, c2))
+        while c2 != end_c:
+            c2 += 1 if end_c > c2 else -1
+            tiles.append((r2, c2))
+        if (end_r, end_c) != end:
+            tiles.append(end)
+        return tiles
+
+
+def _bridges(links):
+    """Doors that are the only way between two parts of the room graph (Tarjan)."""
+    order = [-1] * len(links)
+    low = [0] * len(links)
+    found = set()
+    count = 0
+    for root in range(len(links)):
+        if order[root] >= 0:
+            continue
+        order[root] = low[root] = count
+        count += 1
+        stack = [(root, -1, iter(links[root]))]
+        while stack:
+            room, via, rest = stack[-1]
+            for other, door in rest:
+                if door == via:
+                    continue
+                if order[other] < 0:
+                    order[other] = low[other] = count
+                    count += 1
+                    stack.append((other, door, iter(links[other])))
+                    break
+                low[room] = min(low[room], order[other])
+            else:
+                stack.pop()
+                if stack:
+                    parent = stack[-1][0]
+                    low[parent] = min(low[parent], low[room])
+                    if low[room] > order[parent]:
+                        found.add(via)
+    return found
+
+
+def _apart(a, b):
+    """Fewest moves between a tile of a and a tile of b, in the same room."""
+    return min(abs(r - tr) + abs(c - tc) for r, c in a for tr, tc in b)
+
+
+class WalkBound:
+    """Lower bound on the moves a route still needs, from the shape of the maze.
+
+    Doors that are bridges of the room graph (the only way from one part
+    of the level to another) cut it into a tree of parts. A route must
+    cross into every part that still holds an item beyond such a door,
+    and back out unless it ends there: 2 moves per crossing. In a part
+    that is a single room it also has to get from each door it uses to
+    the next, which is tried for every order and both tiles of each
+    door. In a part with loops the route is searched tile by tile
+    between the doors of the part (_walks), counting each room entered
+    and each door out of it gone through; past LOOP_TARGETS of those it
+    only counts the crossings. Gates are ignored, which only makes the
+    bound lower.
+    """
+
+    def __init__(self, graph):
+        level = graph.level
+        connections = level.layout.connections
+        rooms = len(level.rooms)
+        links = [[] for _ in range(rooms)]
+        for door, (a, b) in enumerate(connections):
+            links[a].append((b, door))
+            links[b].append((a, door))
+        bridges = _bridges(links)
+        self.connections = connections
+        self.items = graph.items
+
+        self.part = part = [-1] * rooms
+        sizes = []
+        for start in range(rooms):
+            if part[start] >= 0:
+                continue
+            part[start] = len(sizes)
+            stack = [start]
+            size = 0
+            while stack:
+                room = stack.pop()
+                size += 1
+                for other, door in links[room]:
+                    if door not in bridges and part[other] < 0:
+                        part[other] = part[start]
+                        stack.append(other)
+            sizes.append(size)
+        self.single = [size == 1 for size in sizes]
+        self.links = links
+        self.bridges = bridges
+        self.part_rooms = [[] for _ in sizes]
+        for room in range(rooms):
+            self.part_rooms[part[room]].append(room)
+
+        # exits[part]: (door, the room it leaves from, the part beyond) per bridge
+        self.exits = [[] for _ in sizes]
+        for door in sorted(bridges):
+            a, b = connections[door]
+            self.exits[part[a]].append((door, a, part[b]))
+            self.exits[part[b]].append((door, b, part[a]))
+        # The tiles just inside a room at each of its doors.
+        self.inside = {}
+        for door, (a, b) in enumerate(connections):
+            for room in (a, b):
+                self.inside[door, room] = [graph._inside(room, tile)
+                                           for tile in level.layout.doors[door]]
+
+        # beyond[door, part]: items (bits of graph.items) on part's side of door.
+        items = [0] * len(sizes)
+        for i, room in enumerate(graph.items):
+            items[part[room]] |= 1 << i
+        self.beyond = {}
+        seen = [False] * len(sizes)
+        for root in range(len(sizes)):
+            if seen[root]:
+                continue
+            seen[root] = True
+            tree = [(root, None)]
+            for node, _ in tree:
+                for door, _, other in self.exits[node]:
+                    if not seen[other]:
+                        seen[other] = True
+                        tree.append((other, door))
+            total = [0] * len(sizes)
+            for node, _ in tree:
+                total[node] = items[node]
+            everything = 0
+            for node, door in reversed(tree):
+                everything |= items[node]
+                if door is not None:
+                    a, b = connections[door]
+                    up = part[a] if part[b] == node else part[b]
+                    total[up] |= total[node]
+            for node, door in tree:
+                if door is not None:
+                    a, b = connections[door]
+                    up = part[a] if part[b] == node else part[b]
+                    self.beyond[door, node] = total[node]
+                    self.beyond[door, up] = everything & ~total[node]
+        self._memo = {}
+        self._walk_memo = {}
+        self._loop_parts = {}
+        self._toward_memo = {}
+        self.work = 0   # states the _walks searches have taken, for search()'s budget
+
+    def _stops(self, part, entry, left):
+        """(door, room, back, end) for every bridge out of part with items left beyond it."""
+        stops = []
+        for door, room, other in self.exits[part]:
+            if door == entry:
+                continue
+            need = left & self.beyond[door, other]
+            if need:
+                back, end = self._visit(door, other, need)
+                stops.append((door, room, back, end))
+        return stops
+
+    def _route(self, start, stops, back_to=None):
+        """Fewest moves across a room from start through every stop.
+
+        Each stop is left and re-entered through a lane (door tile) of its
+        own choosing. Returns the moves to end at each of back_to's tiles,
+        or to end anywhere if back_to is None.
+        """
+        best = [INF] * len(back_to) if back_to else INF
+        for order in permutations(stops):
+            here = [(start, 0)]
+            for k, (door, room, back, end) in enumerate(order):
+                tiles = self.inside[door, room]
+                out = [min(moves + abs(r - tr) + abs(c - tc) for (r, c), moves in here)
+                       for tr, tc in tiles]
+                if back_to is None and k == len(order) - 1:
+                    best = min(best, min(moves + 2 + end[x] for x, moves in enumerate(out)))
+                    break
+                here = [(tile, min(moves + 4 + back[x][y] for x, moves in enumerate(out)))
+                        for y, tile in enumerate(tiles)]
+            else:
+                for y, (tr, tc) in enumerate(back_to):
+                    best[y] = min(best[y], min(moves + abs(r - tr) + abs(c - tc)
+                                               for (r, c), moves in here))
+        return best
+
+    def _visit(self, door, part, left):
+        """(back, end): moves to take the items left in part and beyond, from the
+        tiles just inside door. back[x][y] starts in lane x and comes back to
+        lane y; end[x] starts in lane x and ends anywhere."""
+        key = door, part, left
+        if key not in self._memo:
+            stops = self._stops(part, door, left)
+            a, b = self.connections[door]
+            room = a if self.part[a] == part else b
+            lanes = self.inside[door, room]
+            if self.single[part]:
+                if stops:
+                    back = [self._route(tile, stops, lanes) for tile in lanes]
+                    end = [self._route(tile, stops) for tile in lanes]
+                else:
+                    back = [[_apart([tile], [other]) for other in lanes] for tile in lanes]
+                    end = [0] * len(lanes)
+            else:
+                back, end = zip(*(self._loops(part, room, tile, stops, left, lanes)
+                                  for tile in lanes))
+            self._memo[key] = back, end
+        return self._memo[key]
+
+    def _busy(self, part, start_room, left):
+        """Rooms of part other than start_room with items left in them."""
+        return tuple(sorted({room for i, room in enumerate(self.items)
+                             if left >> i & 1 and self.part[room] == part} - {start_room}))
+
+    def _loops(self, part, start_room, start, stops, left, back_to=()):
+        """(back, end) for a part with loops from the tile start in start_room;
+        back[y] comes back to back_to[y]."""
+        busy = self._busy(part, start_room, left)
+        # The searches only see how much each lane adds, so they are shared
+        # between stops that cost different amounts beyond.
+        there = [min(map(min, back)) for _, _, back, _ in stops]
+        beyond = [min(end) for _, _, _, end in stops]
+        lanes = tuple((door, room, tuple(tuple(cost - base for cost in row) for row in back),
+                       tuple(cost - least for cost in end))
+                      for (door, room, back, end), base, least in zip(stops, there, beyond))
+        walk_back, walk_end, last = self._walks(start_room, start, busy, lanes, tuple(back_to))
+        crossings = sum(4 + base for base in there)
+        end = walk_end + crossings
+        for base, least, walk in zip(there, beyond, last):
+            end = min(end, walk + crossings - base - 2 + least)
+        return [walk + crossings for walk in walk_back], end
+
+    def _walks(self, start_room, start, busy, stops, back_to):
+        """Fewest moves around a part with loops from the tile start, entering
+        every busy room and going through every stop: (ending on each tile
+        of back_to, ending anywhere, ending beyond each stop).
+
+        stops are (door, room, back, end) with the extra moves of each lane
+        beyond the door. A shortest-path search over (tile, rooms and stops
+        done), led by the farthest room or stop still to do (an A* search);
+        most parts are a handful of rooms, so it stays small. Past
+        LOOP_TARGETS rooms and stops, only the rooms spread furthest apart
+        are searched for, and past that many stops only the crossings count.
+        """
+        key = start_room, start, busy, stops, back_to
+        if key in self._walk_memo:
+            return self._walk_memo[key]
+        targets = len(busy) + len(stops)
+        if len(stops) > LOOP_TARGETS:
+            moves = 2 * len(busy)
+            result = [moves] * len(back_to), moves, [moves] * len(stops)
+            self._walk_memo[key] = result
+            return result
+        if targets > LOOP_TARGETS:
+            # Walking through some of the rooms is never longer than all of
+            # them; keep the ones spread furthest apart, starting from start.
+            part = self.part[start_room]
+            tiles, rooms, _, _ = self._loop_tiles(part)
+            r, c = start
+            apart = {room: min(abs(r - tr) + abs(c - tc) + towards
+                               for (tr, tc), inside, towards
+                               in zip(tiles, rooms, self._towards(part, room, None))
+                               if inside == start_room)
+                     for room in busy}
+            kept = []
+            while len(kept) < LOOP_TARGETS - len(stops):
+                far = max(apart, key=apart.get)
+                kept.append(far)
+                del apart[far]
+                for room in apart:
+                    apart[room] = min(apart[room], min(
+                        towards for inside, towards in zip(rooms, self._towards(part, room, None))
+                        if inside == far))
+            kept = tuple(sorted(kept))
+            result = self._walks(start_room, start, kept, stops, back_to)
+            self._walk_memo[key] = result
+            return result
+
+        tiles, rooms, cross, index = self._loop_tiles(self.part[start_room])
+        if start in index:
+            first = index[start]
+        else:
+            first = len(tiles)
+            tiles, rooms = tiles + [start], rooms + [start_room]
+            cross = cross + [self._crossings(start, start_room, index)]
+        room_bit = {room: 1 << bit for bit, room in enumerate(busy)}
+        moves_out = [[(cost, other << targets | room_bit.get(into, 0)) for cost, other, into in way]
+                     for way in cross]
+        stop_at = {}
+        for bit, (door, room, lanes, beyond) in enumerate(stops, len(busy)):
+            stop_at.setdefault(room, []).append(
+                (1 << bit, bit - len(busy), [index[tile] for tile in self.inside[door, room]],
+                 lanes, beyond))
+        goal = (1 << targets) - 1
+        part = self.part[start_room]
+        towards = ([self._towards(part, room, None) for room in busy]
+                   + [self._towards(part, room, door) for door, room, _, _ in stops])
+        back = [INF] * len(back_to)
+        end = INF
+        last = [INF] * len(stops)
+        settled = INF     # no answer can get better once the search gets this far
+        best = [INF] * (len(tiles) << targets)
+        best[first << targets] = 0
+        heap = [(0, 0, first << targets)]
+        while heap:
+            guess, moves, state = heapq.heappop(heap)
+            self.work += 1
+            if guess >= settled:
+                break
+            if moves > best[state]:
+                continue
+            place, done = state >> targets, state & goal
+            r, c = tiles[place]
+            room = rooms[place]
+            if done == goal:
+                # Everything is done; the walk may still have to go back.
+                end = min(end, moves)
+                if room == start_room:
+                    for y, (tr, tc) in enumerate(back_to):
+                        back[y] = min(back[y], moves + abs(r - tr) + abs(c - tc))
+            steps = [(moves + cost, after | done) for cost, after in moves_out[place]]
+            for bit, which, lane_tiles, lanes, beyond in stop_at.get(room, ()):
+                if done & bit:
+                    continue
+                after = done | bit
+                for x, lane in enumerate(lane_tiles):
+                    tr, tc = tiles[lane]
+                    walk = moves + abs(r - tr) + abs(c - tc)
+                    if after == goal:
+                        last[which] = min(last[which], walk + beyond[x])
+                    for y, other in enumerate(lane_tiles):
+                        steps.append((walk + lanes[x][y], other << targets | after))
+            for cost, after in steps:
+                if cost < best[after]:
+                    best[after] = cost
+                    place, todo = after >> targets, ~after & goal
+                    ahead = max([towards[bit][place] for bit in range(targets) if todo >> bit & 1],
+                                default=0)
+                    heapq.heappush(heap, (cost + ahead, cost, after))
+            if end < INF:
+                settled = max([end, *back, *last])
+        self._walk_memo[key] = result = back, end, last
+        return result
+
+    def _loop_tiles(self, part):
+        """(tiles, rooms, crossings, index) for the tiles inside every door of a
+        part with loops; crossings[i] lists (moves, tile, room) for each walk
+        from tile i through a door to another room of the part."""
+        if part not in self._loop_parts:
+            tiles, rooms = [], []
+            for room in self.part_rooms[part]:
+                for _, door in self.links[room]:
+                    for tile in self.inside[door, room]:
+                        tiles.append(tile)
+                        rooms.append(room)
+            index = {tile: i for i, tile in enumerate(tiles)}
+            cross = [self._crossings(tile, room, index) for tile, room in zip(tiles, rooms)]
+            self._loop_parts[part] = tiles, rooms, cross, index
+        return self._loop_parts[part]
+
+    def _towards(self, part, room, door):
+        """Fewest moves from each tile of _loop_tiles(part) into room, or with
+        door given, up to the nearer tile inside door in room."""
+        key = room, door
+        if key not in self._toward_memo:
+            tiles, rooms, cross, _ = self._loop_tiles(part)
+            moves = [INF] * len(tiles)
+            lanes = self.inside[door, room] if door is not None else ()
+            for i, (r, c) in enumerate(tiles):
+                if rooms[i] == room:
+                    moves[i] = min((abs(r - tr) + abs(c - tc) for tr, tc in lanes), default=0)
+            into = [[] for _ in tiles]
+            for i, way in enumerate(cross):
+                for cost, other, _ in way:
+                    into[other].append((cost, i))
+            heap = [(cost, i) for i, cost in enumerate(moves) if cost < INF]
+            heapq.heapify(heap)
+            while heap:
+                cost, i = heapq.heappop(heap)
+                if cost > moves[i]:
+                    continue
+                for step, other in into[i]:
+                    if cost + step < moves[other]:
+                        moves[other] = cost + step
+                        heapq.heappush(heap, (cost + step, other))
+            self._toward_memo[key] = moves
+        return self._toward_memo[key]
+
+    def _crossings(self, tile, room, index):
+        r, c = tile
+        found = []
+        for other, door in self.links[room]:
+            if door not in self.bridges:
+                for (tr, tc), into in zip(self.inside[door, room], self.inside[door, other]):
+                    found.append((abs(r - tr) + abs(c - tc) + 2, index[into], other))
+        return found
+
+    def estimate(self, room, cell, left):
+        """Moves still needed from cell (in room) to take the items in left."""
+        part = self.part[room]
+        stops = self._stops(part, None, left)
+        if not stops and self.single[part]:
+            return 0
+        if self.single[part]:
+            return self._route(cell, stops)
+        if not stops and not self._busy(part, room, left):
+            return 0
+        return self._loops(part, room, tuple(cell), stops, left)[1]
+
+
+def search(graph, budget=SEARCH_BUDGET):
+    """Shortest (cost, [(item, node), ...], proven) in pickup order, or (None, None, False).
+
+    Once the estimates have taken budget steps (WalkBound.work) without a
+    finished route, the search stops: the route furthest along is finished
+    by finish() and shortened by improve(), and proven is False.
+    """
+    n = len(graph.items)
+    if n == 0:
+        return 0, [], True
+    full = (1 << n) - 1
+    bound = WalkBound(graph)
+    nodes = len(graph.cells)
+
+    def estimate(mask, node):
+        return bound.estimate(graph.node_room[node], graph.cells[node], full & ~mask)
+
+    # States are mask * nodes + node; cost[state] is the best route found to it.
+    # A state goes on the heap with its parent's estimate, which is never
+    # more than its own, and gets its own when it comes up: most states are
+    # never reached, so most estimates are never needed. Among equal
+    # estimates, the route furthest along goes first.
+    cost = {0: 0}
+    parent = {}
+    heap = [(0, 0, 0, False)]
+    furthest = (0, 0)   # (items taken, -state) of the route furthest along
+    while heap:
+        guess, moves, state, estimated = heapq.heappop(heap)
+        moves = -moves
+        if moves > cost[state]:
+            continue
+        mask, node = divmod(state, nodes)
+        if not estimated:
+            if bound.work > budget:
+                break
+            bound.work += 1
+            own = moves + estimate(mask, node)
+            if own > guess:
+                heapq.heappush(heap, (own, -moves, state, True))
+                continue
+        if mask == full:
+            return moves, _route_to(state, parent, nodes), True
+        furthest = max(furthest, (mask.bit_count(), -state))
+        dist = graph.table(mask)[node]
+        for j, targets in enumerate(graph.item_nodes):
+            if mask >> j & 1:
+                continue
+            after = mask | 1 << j
+            for target in targets:
+                total = moves + dist[target]
+                if total >= INF:
+                    continue
+                new = after * nodes + target
+                if total < cost.get(new, INF):
+                    cost[new] = total
+                    parent[new] = state
+                    heapq.heappush(heap, (max(guess, total), -total, new, False))
+    if not heap:
+        return None, None, False
+
+    state = -furthest[1]
+    mask, node = divmod(state, nodes)
+    moves, rest = finish(graph, mask, node)
+    if rest is None:
+        return None, None, False
+    moves, route = improve(graph, [j for j, _ in _route_to(state, parent, nodes) + rest])
+    return moves, route, False
+
+
+def _route_to(state, parent, nodes):
+    route = []
+    while state:
+        mask, node = divmod(state, nodes)
+        previous = parent[state]
+        route.append(((mask ^ previous // nodes).bit_length() - 1, node))
+        state = previous
+    route.reverse()
+    return route
+
+
+def improve(graph, order):
+    """(moves, route) for the item order, made shorter by moving one item at
+    a time to wherever in the order it saves the most, until none does."""
+    best, route = _follow(graph, order)
+    better = True
+    while better:
+        better = False
+        for i in range(len(order)):
+            rest = order[:i] + order[i + 1:]
+            for place in range(len(order)):
+                if place == i:
+                    continue
+                trial = rest[:place] + [order[i]] + rest[place:]
+                moves, trial_route = _follow(graph, trial)
+                if moves < best:
+                    best, route, order, better = moves, trial_route, trial, True
+                    break
+    return best, route
+
+
+def _follow(graph, order):
+    """Shortest (moves, route) taking the items in order, choosing the door
+    each one is entered by; moves is INF if the order can't be walked."""
+    layers = []
+    reach = {0: (0, None)}  # node -> (moves, node before)
+    mask = 0
+    for j in order:
+        dist = graph.table(mask)
+        after = {}
+        for node, (moves, _) in reach.items():
+            row = dist[node]
+            for target in graph.item_nodes[j]:
+                total = moves + row[target]
+                if row[target] < INF and total < after.get(target, (INF,))[0]:
+                    after[target] = (total, node)
+        if not after:
+            return INF, None
+        layers.append(after)
+        reach = after
+        mask |= 1 << j
+    node = min(reach, key=lambda node: reach[node][0])
+    moves = reach[node][0]
+    route = []
+    for j, layer in zip(reversed(order), reversed(layers)):
+        route.append((j, node))
+        node = layer[node][1]
+    route.reverse()
+    return moves, route
+
+
+def finish(graph, mask, node):
+    """(moves, [(item, node), ...]) taking the items not in mask from node,
+    nearest first, or (None, None) if no order works.
+
+    Depth first, so it only backs up when a lock or one-way door strands
+    the route; the route is short, but not always the shortest.
+    """
+    full = (1 << len(graph.items)) - 1
+    stranded = set()    # (mask, node) that no order finishes from
+    route = []
+
+    def steps(mask, node, moves):
+        # Nearest last, to be popped first.
+        dist = graph.table(mask)[node]
+        return sorted(((moves + dist[target], j, target)
+                       for j, targets in enumerate(graph.item_nodes) if not mask >> j & 1
+                       for target in targets if dist[target] < INF), reverse=True)
+
+    stack = [(mask, node, 0, steps(mask, node, 0))]
+    while stack:
+        mask, node, moves, left = stack[-1]
+        if mask == full:
+            return moves, route
+        while left:
+            total, j, target = left.pop()
+            after = mask | 1 << j
+            if (after, target) not in stranded:
+                route.append((j, target))
+                stack.append((after, target, total, steps(after, target, total)))
+                break
+        else:
+            stranded.add((mask, node))
+            stack.pop()
+            if route:
+                route.pop()
+    return None, None
+
+
+def solve(level, budget=SEARCH_BUDGET):
+    """Shortest item route for level as a Solution, or None if it can't be won."""
+    graph = RouteGraph(level)
+    cost, route, proven = search(graph, budget)
+    if cost is None:
+        return None
+
+    inputs = []
+    position = level.spawn
+    mask = 0
+    source = 0
+    for i, node in route:
+        for tile in graph.path(mask, source, node):
+            inputs.append(STEPS[tile[0] - position[0], tile[1] - position[1]])
+            position = tile
+        mask |= 1 << i
+        source = node
+
+    engine = GameEngine(level)
+    for par, direction in enumerate(inputs, 1):
+        engine.move(direction)
+        if engine.game_over:
+            break
+    else:
+        par = None
+    return Solution([graph.items[i] for i, _ in route], cost, inputs, par, proven)
+
+
+def fewest_moves(level):
+    """Fewest moves that win level, by playing every reachable state
+    breadth first through the engine; None if it can't be won.
+
+    A check on solve() for small levels: the states number tiles times
+    subsets of items, so anything past a few thousand tiles is slow.
+    """
+    engine = GameEngine(level)
+    if not level.total_items:
+        return 0
+    # Visited rooms never change how the game plays on, so leaving them
+    # out merges states that differ only there.
+    start = engine.snapshot()
+    start.visited = 0
+    seen = StateSet(level)
+    seen.add(start)
+    frontier = [start]
+    moves = 0
+    while frontier:
+        moves += 1
+        after = []
+        for state in frontier:
+            for direction in (UP, DOWN, LEFT, RIGHT):
+                engine.restore(state)
+                if not engine.move(direction):
+                    continue
+                if engine.game_over:
+                    return moves
+                reached = engine.snapshot()
+                reached.visited = 0
+                if seen.add(reached):
+                    after.append(reached)
+        frontier = after
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--level", default="v3", choices=sorted(levels.LEVELS))
+    parser.add_argument("--check", action="store_true",
+                        help="compare par with a breadth-first search over every game state")
+    args = parser.parse_args()
+
+    level = levels.LEVELS[args.level]
+    solution = solve(level)
+    if solution is None:
+        print(f"Level {level.name} cannot be won")
+        return
+    names = [level.rooms[room]["item"] for room in solution.order]
+    print(f"order: {' -> '.join(names)}")
+    print(f"route length: {solution.moves}")
+    print(f"par: {solution.par}" + ("" if solution.optimal else " (search budget ran out, may not be the fewest)"))
+    if args.check:
+        print(f"fewest moves (breadth first): {fewest_moves(level)}")
+
+
+if __name__ == "__main__":
+    main()
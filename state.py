@@ -0,0 +1,131 @@
+"""Compact game states for search, replay and undo.
+
+A GameState packs everything that decides how a game plays on from a
+given point into a few ints. GameEngine.snapshot() makes one and
+GameEngine.restore() puts it back; SnapshotRing keeps the last few for
+undo and StateSet remembers which ones a search has already seen.
+"""
+
+COORD_BITS = 16  # rows, columns and room indices all fit in 16 bits
+
+
+class GameState:
+    """Player position plus bitmasks of collected items and visited rooms.
+
+    Bit i of items / visited stands for room i. Score, the win flag and
+    which doors are open all follow from items, so they are not stored.
+    Two states are equal when everything but moves matches: reaching the
+    same spot by a longer route is the same state to a search.
+    """
+
+    __slots__ = ("row", "col", "room", "items", "visited", "moves")
+
+    def __init__(self, row, col, room, items, visited, moves=0):
+        self.row = row
+        self.col = col
+        self.room = room
+        self.items = items
+        self.visited = visited
+        self.moves = moves
+
+    def pack(self, room_count):
+        """The state (without moves) as a single int, for a level of room_count rooms."""
+        key = (self.visited << room_count | self.items) << COORD_BITS
+        key = (key | self.room) << COORD_BITS
+        return (key | self.row) << COORD_BITS | self.col
+
+    def __eq__(self, other):
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return (self.row == other.row and self.col == other.col
+                and self.room == other.room and self.items == other.items
+                and self.visited == other.visited)
+
+    def __hash__(self):
+        return hash((self.row, self.col, self.room, self.items, self.visited))
+
+    def copy(self):
+        return GameState(self.row, self.col, self.room, self.items, self.visited, self.moves)
+
+    @property
+    def score(self):
+        return self.items.bit_count()
+
+    def __repr__(self):
+        return (f"GameState(row={self.row}, col={self.col}, room={self.room}, "
+                f"items={self.items:#x}, visited={self.visited:#x}, moves={self.moves})")
+
+
+def rooms_in(mask):
+    """Room indices whose bits are set in mask, lowest first."""
+    rooms = []
+    while mask:
+        low = mask & -mask
+        rooms.append(low.bit_length() - 1)
+        mask ^= low
+    return rooms
+
+
+class SnapshotRing:
+    """The last capacity states in a fixed list; push and pop are O(1).
+
+    Pushing onto a full ring drops the oldest snapshot, so undo reaches
+    back at most capacity steps.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.slots = [None] * capacity
+        self.head = 0     # slot the next push goes into
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, state):
+        self.slots[self.head] = state
+        self.head = (self.head + 1) % len(self.slots)
+        self.count = min(self.count + 1, len(self.slots))
+
+    def pop(self):
+        """Remove and return the newest snapshot."""
+        if not self.count:
+            raise IndexError("pop from an empty SnapshotRing")
+        self.head = (self.head - 1) % len(self.slots)
+        self.count -= 1
+        state = self.slots[self.head]
+        self.slots[self.head] = None
+        return state
+
+    def peek(self):
+        if not self.count:
+            raise IndexError("peek at an empty SnapshotRing")
+        return self.slots[(self.head - 1) % len(self.slots)]
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+        self.head = 0
+        self.count = 0
+
+
+class StateSet:
+    """States of one level a search has already reached, stored as packed ints."""
+
+    def __init__(self, level):
+        self.room_count = len(level.rooms)
+        self.seen = set()
+
+    def __len__(self):
+        return len(self.seen)
+
+    def __contains__(self, state):
+        return state.pack(self.room_count) in self.seen
+
+    def add(self, state):
+        """Remember state; return True if it had not been seen before."""
+        key = state.pack(self.room_count)
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        return True
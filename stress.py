@@ -0,0 +1,380 @@
+"""Randomised stress test of the game rules through RoomGameV2 and RoomGameV3.
+
+    python stress.py --moves 2000000
+    python stress.py --games v3 --out stress.json --baseline before.json
+
+Walkers play each game on benchmark.make_game() the way players and bots do:
+holding a key for a random run of ticks, standing idle, or queueing a
+burst of presses with queue_key(). Every tick goes through poll_keys()
+and handle_input(). After every move the engine makes, the rules are
+checked against the level's JSON file, read again here, not against
+the engine's own tables:
+
+  - the player stands on a room or door tile, never a wall
+  - the player is never in a room or door whose keys are not all held,
+    and in V3 never in the Secret Room (8) before the Key (room 5)
+  - a one-way door is only ever entered from its entry room
+  - a move changes the position by exactly one tile, or not at all
+  - score == items collected == bits of item_mask, all in item rooms
+  - the game is won exactly when every item has been collected
+
+Every snapshot_every moves, a fresh engine restored from snapshot() must
+agree on the open doors and walkable tiles. A walker that wins starts a
+new game. The first broken invariant stops the run with the game, seed
+and move number needed to replay it.
+
+Reported per game: moves per second over the whole run and over its
+slowest window, and peak memory: after the timed run, MEMORY_WALKERS
+more walkers play under tracemalloc, and the most any one game of theirs
+allocated is reported. With --baseline, a slowdown or memory growth over
+--tolerance fails the run, like benchmark.py.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import time
+import tracemalloc
+
+import benchmark
+import levels
+from layout import DOOR, WALL
+
+KEYS = benchmark.KEYS
+WINDOW = 0.5  # seconds per throughput sample
+MEMORY_WALKERS = 2
+V3_SECRET_ROOM, V3_KEY_ROOM = 8, 5
+
+
+class InvariantError(AssertionError):
+    pass
+
+
+class LevelRules:
+    """What a level's JSON file says about every tile, for checking the engine against.
+
+    Rooms are room_size squares laid out rooms_per_row to a row with
+    wall_size between them, and each door is the two tiles room_size // 2
+    in along the wall it crosses. cells[r][c] is the room, WALL, or DOOR - d
+    for doors[d] of the file. A room needs its locks' keys and a door its
+    own keys plus both rooms'; bits are rooms, as in engine.item_mask.
+    """
+
+    def __init__(self, level, path=None):
+        with open(path or os.path.join(levels.DATA_DIR, f"{level.name}.json")) as f:
+            spec = json.load(f)
+        self.level = level
+        rooms = spec["rooms"]
+        size = spec["room_size"]
+        step = size + spec.get("wall_size", 1)
+        per_row = spec.get("rooms_per_row", 3)
+        grid = spec["grid_size"]
+        corners = [(idx // per_row * step, idx % per_row * step) for idx in range(len(rooms))]
+        self.cells = [[WALL] * grid for _ in range(grid)]
+        for idx, (top, left) in enumerate(corners):
+            for r in range(top, top + size):
+                self.cells[r][left:left + size] = [idx] * size
+        doors = [tuple(pair) for pair in spec["doors"]]
+        for door, (a, b) in enumerate(doors):
+            (top, left), (other_top, other_left) = sorted((corners[a], corners[b]))
+            if top == other_top:
+                tiles = [(top + size // 2 + i, c) for i in (0, 1)
+                         for c in range(left + size, other_left)]
+            else:
+                tiles = [(r, left + size // 2 + i) for i in (0, 1)
+                         for r in range(top + size, other_top)]
+            for r, c in tiles:
+                self.cells[r][c] = DOOR - door
+
+        self.room_need = [0] * len(rooms)
+        for lock in spec.get("locks", []):
+            self.room_need[lock["room"]] |= 1 << lock["key"]
+        own_need = [0] * len(doors)
+        self.door_entry = [-1] * len(doors)
+        for rule in spec.get("rules", []):
+            keys = sum(1 << key for key in rule.get("keys", ()))
+            if rule["type"] == "lock":
+                self.room_need[rule["room"]] |= keys
+                continue
+            pair = tuple(rule["door"])
+            door = doors.index(pair) if pair in doors else doors.index(pair[::-1])
+            if rule["type"] == "door":
+                own_need[door] |= keys
+            elif rule["type"] == "one_way":
+                self.door_entry[door] = pair[0]
+        self.door_need = [own_need[door] | self.room_need[a] | self.room_need[b]
+                          for door, (a, b) in enumerate(doors)]
+        self.item_rooms = 0
+        for idx, room in enumerate(rooms):
+            if room["item"]:
+                self.item_rooms |= 1 << idx
+
+    def describe(self, need):
+        rooms = self.level.rooms
+        return ", ".join(f"{rooms[idx]['item']} ({rooms[idx]['name']})"
+                         for idx in range(len(rooms)) if need >> idx & 1)
+
+
+class Walker:
+    """One seeded random player on a stubbed game, checked after every move."""
+
+    def __init__(self, module, seed, rules, snapshot_every=1000):
+        self.module = module
+        self.seed = seed
+        self.rules = rules
+        self.snapshot_every = snapshot_every
+        self.rng = random.Random(f"stress:{module.__name__}:{seed}")
+        self.moves = 0          # engine moves made, summed over games
+        self.ticks = 0
+        self.games = 0
+        self.wins = 0
+        self.held = None
+        self.hold_ticks = 0
+        self.game = None
+        self.peak_memory = 0    # most bytes one game allocated, while tracemalloc runs
+        self.new_game()
+
+    def new_game(self):
+        self.finish_game()
+        self.game = self.engine = None
+        if tracemalloc.is_tracing():
+            gc.collect()  # the checked move below ties the old engine into a cycle
+            self.game_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.game = benchmark.make_game(self.module)
+        self.engine = self.game.engine
+        self.games += 1
+        self.base_moves = self.moves
+        move = self.engine.move
+
+        def checked(direction):
+            engine = self.engine
+            before = tuple(engine.player_pos)
+            before_room = engine.player_room
+            moved = move(direction)
+            self.check(before, before_room, moved)
+            return moved
+
+        # handle_input calls engine.move, so every move it makes is checked.
+        self.engine.move = checked
+
+    def finish_game(self):
+        """Count the current game towards peak_memory if tracemalloc is on."""
+        if self.game is not None and tracemalloc.is_tracing():
+            self.peak_memory = max(self.peak_memory,
+                                   tracemalloc.get_traced_memory()[1] - self.game_start)
+
+    def tick(self):
+        game = self.game
+        rng = self.rng
+        if not self.hold_ticks:
+            roll = rng.random()
+            self.hold_ticks = rng.randint(1, 12)
+            if roll < 0.15:
+                self.held = None
+            elif roll < 0.3:
+                self.held = None
+                for _ in range(rng.randint(2, 8)):
+                    game.queue_key(KEYS[rng.randrange(4)])
+            else:
+                self.held = KEYS[rng.randrange(4)]
+        self.hold_ticks -= 1
+        game.transport.pressed = self.held
+        game.poll_keys()
+        game.handle_input()
+        self.ticks += 1
+        if game.game_over:
+            self.wins += 1
+            self.new_game()
+
+    def fail(self, message):
+        engine = self.engine
+        raise InvariantError(
+            f"{self.module.__name__} seed {self.seed}, move {self.moves - self.base_moves} "
+            f"of game {self.games}: {message} (at {engine.player_pos}, room {engine.player_room}, "
+            f"items {sorted(engine.items_collected)})")
+
+    def check(self, before, before_room, moved):
+        engine = self.engine
+        rules = self.rules
+        r, c = engine.player_pos
+        if moved:
+            self.moves += 1
+            if abs(r - before[0]) + abs(c - before[1]) != 1:
+                self.fail(f"moved from {before} to {(r, c)} in one step")
+        elif (r, c) != before:
+            self.fail(f"a refused move went from {before} to {(r, c)}")
+
+        cell = rules.cells[r][c]
+        if cell == WALL:
+            self.fail("standing on a wall")
+        held = engine.item_mask
+        if cell >= 0:
+            missing = rules.room_need[cell] & ~held
+            if missing:
+                self.fail(f"in {self.rules.level.rooms[cell]['name']} "
+                          f"without {rules.describe(missing)}")
+            if (rules.level.name == "v3" and cell == V3_SECRET_ROOM
+                    and not held >> V3_KEY_ROOM & 1):
+                self.fail("in the Secret Room without the Key")
+        else:
+            door = DOOR - cell
+            missing = rules.door_need[door] & ~held
+            if missing:
+                self.fail(f"in door {door} without {rules.describe(missing)}")
+            entry = rules.door_entry[door]
+            if moved and entry >= 0 and rules.cells[before[0]][before[1]] >= 0 \
+                    and before_room != entry:
+                self.fail(f"entered one-way door {door} from room {before_room}")
+
+        collected = len(engine.items_collected)
+        if not engine.score == collected == held.bit_count():
+            self.fail(f"score {engine.score} with {collected} items collected, "
+                      f"item_mask {held:#x}")
+        if held & ~rules.item_rooms:
+            self.fail(f"item_mask {held:#x} has rooms without items")
+        if engine.game_over != (collected == rules.level.total_items):
+            self.fail(f"game_over is {engine.game_over} with {collected} of "
+                      f"{rules.level.total_items} items")
+
+        if moved and self.snapshot_every and self.moves % self.snapshot_every == 0:
+            self.check_restore()
+
+    def check_restore(self):
+        engine = self.engine
+        fresh = type(engine)(engine.level)
+        fresh.restore(engine.snapshot())
+        if fresh.doors.open_doors != engine.doors.open_doors:
+            self.fail("a restored snapshot opens different doors")
+        if (fresh.walkable != engine.walkable).any():
+            self.fail("a restored snapshot has different walkable tiles")
+
+
+def stress(name, moves, seed=0, walk_ticks=20000, snapshot_every=1000):
+    """Run walkers on game name until moves engine moves; return the results."""
+    module = benchmark.GAMES[name]
+    rules = LevelRules(module.LEVEL)
+    total_moves = ticks = games = wins = walkers = 0
+    windows = []
+    start = window_start = time.perf_counter()
+    window_moves = 0
+    clock = time.perf_counter
+    # The games print every pickup; keep that out of the output and the timing.
+    with contextlib.redirect_stdout(io.StringIO()):
+        while total_moves < moves:
+            walker = Walker(module, seed + walkers, rules, snapshot_every)
+            walkers += 1
+            while walker.ticks < walk_ticks and total_moves + walker.moves < moves:
+                walker.tick()
+                if not walker.ticks % 256:
+                    now = clock()
+                    if now - window_start >= WINDOW:
+                        done = total_moves + walker.moves
+                        windows.append((done - window_moves) / (now - window_start))
+                        window_start, window_moves = now, done
+            total_moves += walker.moves
+            ticks += walker.ticks
+            games += walker.games
+            wins += walker.wins
+        elapsed = clock() - start
+        peak = game_memory(module, rules, seed + walkers, walk_ticks, snapshot_every)
+    return {
+        "game": name,
+        "moves": total_moves,
+        "ticks": ticks,
+        "walkers": walkers,
+        "games": games,
+        "wins": wins,
+        "elapsed_s": round(elapsed, 3),
+        "moves_per_second": round(total_moves / elapsed),
+        "slowest_window_moves_per_second": round(min(windows)) if windows else None,
+        "peak_memory_kib": peak,
+    }
+
+
+def game_memory(module, rules, seed, ticks, snapshot_every=1000):
+    """KiB allocated by the hungriest game of MEMORY_WALKERS walkers, by tracemalloc.
+
+    Walkers play ticks ticks each, after the timed run so tracing does not
+    slow it down.
+    """
+    peak = 0
+    tracemalloc.start()
+    try:
+        for n in range(MEMORY_WALKERS):
+            walker = Walker(module, seed + n, rules, snapshot_every)
+            while walker.ticks < ticks:
+                walker.tick()
+            walker.finish_game()
+            peak = max(peak, walker.peak_memory)
+    finally:
+        tracemalloc.stop()
+    return peak // 1024
+
+
+def regressions(report, baseline, tolerance):
+    """Results slower or bigger than baseline by more than tolerance, as messages."""
+    old = {r["game"]: r for r in baseline["results"]}
+    found = []
+    for result in report["results"]:
+        before = old.get(result["game"])
+        if before is None:
+            continue
+        for metric in ("moves_per_second", "slowest_window_moves_per_second"):
+            if before[metric] and result[metric] is not None and \
+                    result[metric] < before[metric] * (1 - tolerance):
+                found.append(f"{result['game']} {metric}: {before[metric]} -> {result[metric]}")
+        memory = "peak_memory_kib"
+        if before[memory] and result[memory] and result[memory] > before[memory] * (1 + tolerance):
+            found.append(f"{result['game']} {memory}: {before[memory]} -> {result[memory]}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", nargs="+", default=sorted(benchmark.GAMES),
+                        choices=sorted(benchmark.GAMES))
+    parser.add_argument("--moves", type=int, default=1000000, help="engine moves per game")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--walk-ticks", type=int, default=20000,
+                        help="ticks before a walker hands over to the next seed")
+    parser.add_argument("--snapshot-every", type=int, default=1000)
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = []
+    for name in args.games:
+        try:
+            result = stress(name, args.moves, args.seed, args.walk_ticks, args.snapshot_every)
+        except InvariantError as e:
+            print(f"FAILED: {e}")
+            raise SystemExit(1)
+        results.append(result)
+        print(f"{name}: {result['moves']} moves in {result['ticks']} ticks, "
+              f"{result['games']} games ({result['wins']} won), "
+              f"{result['moves_per_second']} moves/s "
+              f"(slowest window {result['slowest_window_moves_per_second']}), "
+              f"peak memory {result['peak_memory_kib']} KiB")
+    report = {"python": platform.python_version(), "machine": platform.machine(),
+              "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        for message in found:
+            print(f"regression: {message}")
+        if found:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""delta.py's run encoding, and the encoder and receiver losing and
+regaining sync."""
+import asyncio
+import contextlib
+import io
+import zlib
+
+import numpy as np
+import pytest
+
+import batch
+import host
+from delta import (DELTA, HEADER, KEYFRAME, DeltaTransport, FrameEncoder, MockReceiver,
+                   apply_runs, encode_runs)
+
+ROWS = COLS = 32
+
+
+def planes(seed, changes=40):
+    """Random bg / symbol / symbol color planes, mostly one big fill."""
+    rng = np.random.default_rng(seed)
+    bg = np.full((ROWS, COLS), 3, dtype=np.int16)
+    symbol = np.zeros((ROWS, COLS), dtype=np.int16)
+    symbol_color = np.full((ROWS, COLS), 3, dtype=np.int16)
+    for plane in (bg, symbol, symbol_color):
+        plane.flat[rng.integers(0, ROWS * COLS, changes)] = rng.integers(0, 256, changes)
+    return bg, symbol, symbol_color
+
+
+def round_trip(cells, base):
+    out = np.zeros_like(cells) if base is None else base.copy()
+    apply_runs(out, bytes(encode_runs(cells, base)), 0)
+    return out
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_runs_round_trip(seed):
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 1 << 24, ROWS * COLS).astype(np.int32)
+    cells = base.copy()
+    # Runs of every length, some well past one varint byte.
+    for length in (1, 2, 127, 128, 300):
+        start = int(rng.integers(0, ROWS * COLS - length))
+        cells[start:start + length] = int(rng.integers(0, 1 << 24))
+    assert (round_trip(cells, base) == cells).all()
+    assert (round_trip(cells, None) == cells).all()
+
+
+def test_a_fill_is_one_run():
+    cells = np.full(ROWS * COLS, 0x0A0B0C, dtype=np.int32)
+    data = encode_runs(cells, None)
+    assert data == bytes([0]) + bytes([0x80, 0x08]) + bytes([0x0A, 0x0B, 0x0C])
+    assert encode_runs(cells, cells.copy()) == b""
+
+
+def test_deltas_build_on_the_last_acknowledged_frame():
+    encoder, receiver = FrameEncoder(), MockReceiver(ROWS, COLS)
+    first = encoder.encode(*planes(0))
+    assert HEADER.unpack_from(first)[0] == KEYFRAME
+    assert receiver.receive(first) == (True, 1)
+    encoder.ack(1)
+
+    encoder.encode(*planes(1))   # lost on the way
+    third = encoder.encode(*planes(2))
+    kind, frame, base, _ = HEADER.unpack_from(third)
+    assert (kind, frame, base) == (DELTA, 3, 1)
+    assert len(third) < len(first)
+    assert receiver.receive(third) == (True, 3)
+    assert all((a == b).all() for a, b in zip(receiver.planes(), planes(2)))
+
+
+@pytest.mark.parametrize("damage", ["missing base", "flipped bit", "cut short"])
+def test_desync_recovers_with_a_keyframe(damage):
+    encoder, receiver = FrameEncoder(), MockReceiver(ROWS, COLS)
+    receiver.receive(encoder.encode(*planes(0)))
+    encoder.ack(1)
+    message = bytearray(encoder.encode(*planes(1)))
+    if damage == "missing base":
+        receiver = MockReceiver(ROWS, COLS)     # a client that never saw frame 1
+    elif damage == "flipped bit":
+        message[-1] ^= 1
+    else:
+        del message[-2:]
+    acked, frame = receiver.receive(bytes(message))
+    assert not acked and frame == 2
+
+    encoder.desync()
+    message = encoder.encode(*planes(1))
+    assert HEADER.unpack_from(message)[0] == KEYFRAME
+    assert receiver.receive(message) == (True, 3)
+    assert zlib.crc32(receiver.current.tobytes()) == HEADER.unpack_from(message)[3]
+
+
+def test_lossy_session_stays_in_sync():
+    transport = DeltaTransport(batch.random_walk("delta-test", 600), loss=0.1, seed=1)
+    session_host = host.SessionHost("v3")
+    session_host.open(transport)
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(session_host.run())
+    assert transport.desyncs > 0
+    assert transport.encoder.keyframes > 1
+    assert (transport.receiver.current == transport.encoder.acked_cells).all()
+    assert transport.bytes_per_frame < HEADER.size + 3 * ROWS * COLS
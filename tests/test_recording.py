@@ -0,0 +1,63 @@
+"""Round trips through recording.py's byte format, and a recorded game."""
+import contextlib
+import io
+
+import pytest
+
+import benchmark
+import frontend
+import levels
+import RoomGameV3
+import solver
+from engine import DOWN, LEFT, RIGHT, UP
+from recording import (HEADER, MAX_IDLE_RUN, Recording, decode_inputs, encode_inputs,
+                       verify)
+
+
+@pytest.mark.parametrize("idle", [1, MAX_IDLE_RUN - 1, MAX_IDLE_RUN, MAX_IDLE_RUN + 1, 300])
+def test_idle_runs_round_trip(idle):
+    inputs = [RIGHT] + [None] * idle + [LEFT]
+    data = encode_inputs(inputs)
+    assert decode_inputs(data) == inputs
+    # One byte per started run of MAX_IDLE_RUN ticks, plus one per move.
+    assert len(data) == -(-idle // MAX_IDLE_RUN) + 2
+
+
+@pytest.mark.parametrize("tail", [1, 2, 3])
+def test_move_tails_round_trip(tail):
+    moves = [UP, DOWN, LEFT, RIGHT, DOWN, UP][:3 + tail]
+    for inputs in (moves, [None] + moves, moves + [None]):
+        assert decode_inputs(encode_inputs(inputs)) == inputs
+
+
+@pytest.mark.parametrize("byte", [0x00, 0x01, 0x02, 0x03])
+def test_bad_tag_byte(byte):
+    with pytest.raises(ValueError, match="Bad input byte"):
+        decode_inputs(bytes([0x05, byte]))
+
+
+def test_tick_count_mismatch():
+    data = bytearray(Recording("v3", [UP, None, None, RIGHT], b"\0" * 8).to_bytes())
+    assert Recording.from_bytes(bytes(data)).inputs == [UP, None, None, RIGHT]
+    HEADER.pack_into(data, 0, b"RGI1", 2, 5, b"\0" * 8)
+    with pytest.raises(ValueError, match="5 ticks but holds 4"):
+        Recording.from_bytes(bytes(data))
+
+
+def test_won_game_saves_and_drops_its_exit_hook(tmp_path, monkeypatch):
+    hooks = []
+    monkeypatch.setattr(frontend.atexit, "register", hooks.append)
+    monkeypatch.setattr(frontend.atexit, "unregister", hooks.remove)
+    path = tmp_path / "session.rgi"
+    game = benchmark.make_game(RoomGameV3, record_to=str(path))
+    assert hooks == [game.save_recording]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for direction in solver.solve(levels.V3).inputs:
+            game.transport.pressed = benchmark.KEYS[direction]
+            game.game_loop()
+    assert game.game_over
+    assert hooks == []
+    recording = Recording.load(path)
+    assert len(recording.inputs) == game.engine.moves
+    assert verify(recording)
@@ -0,0 +1,123 @@
+"""The rules in level_data/gates.json, checked by playing them.
+
+Every test walks the player through GameEngine.move and looks only at
+where the player ends up and what it holds, never at the compiled gates,
+so a mistake in rules.py or doorgraph.py can't agree with itself.
+
+gates.json is 3x3 rooms of 10x10 tiles with 1-tile walls; room n's top
+left corner is (11 * (n // 3), 11 * (n % 3)) and each door is the two
+tiles 5 and 6 in along the wall it crosses.
+"""
+import json
+import os
+
+import pytest
+
+import levels
+from engine import DOWN, GameEngine, LEFT, RIGHT, UP
+
+STEPS = {"U": UP, "D": DOWN, "L": LEFT, "R": RIGHT}
+
+# Routes from where the one before leaves off.
+TO_ROOM_1 = "D4 R10"            # spawn (1, 1) to (5, 11), taking the Key in room 1
+ROOM_1_TO_2 = "R11"             # to (5, 22), taking the Torch in room 2
+ROOM_2_TO_5 = "R5 D6"           # through the one-way door (2, 5) to (11, 27), taking the Gem
+ROOM_5_TO_4 = "D5 L7"           # to (16, 20), taking the Book in room 4
+ROOM_4_TO_6 = "L11 L3 D6"       # through door (3, 4) and room 3 to (22, 6), taking the Key
+ROOM_6_TO_8 = "D5 R16"          # through room 7 to (27, 22), taking the Gold
+
+
+@pytest.fixture(scope="module")
+def spec():
+    with open(os.path.join(levels.DATA_DIR, "gates.json")) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def engine():
+    return GameEngine(levels.LEVELS["gates"])
+
+
+def walk(engine, route):
+    """Make every move in route ("D4 R10": 4 down, then 10 right); each must succeed."""
+    for step in route.split():
+        for _ in range(int(step[1:] or 1)):
+            assert engine.move(STEPS[step[0]]), f"{step} stopped at {engine.player_pos}"
+
+
+def holds(engine, *rooms):
+    return all(engine.item_mask >> room & 1 for room in rooms)
+
+
+def test_level_has_the_rules_under_test(spec):
+    rules = spec["rules"]
+    assert {"type": "door", "door": [3, 4], "keys": [1]} in rules
+    assert {"type": "one_way", "door": [2, 5]} in rules
+    assert {"type": "lock", "room": 8, "keys": [4, 6]} in rules
+
+
+def test_door_3_4_stays_shut_until_the_item_in_room_1_is_taken(engine):
+    walk(engine, "D8 R4 D7 R4")     # through door (0, 3) to (16, 9), beside door (3, 4)
+    assert engine.player_room == 3 and not holds(engine, 1)
+    assert not engine.move(RIGHT)
+    assert engine.player_pos == [16, 9]
+
+    walk(engine, "L4 U11 R6")       # back through room 0 to (5, 11) in room 1
+    assert engine.player_room == 1 and holds(engine, 1)
+    walk(engine, "L6 D11 R4")       # back to (16, 9)
+    walk(engine, "R2")
+    assert engine.player_room == 4 and holds(engine, 4)
+
+
+def test_door_2_5_cannot_be_entered_from_room_5(engine):
+    walk(engine, " ".join((TO_ROOM_1, ROOM_1_TO_2, ROOM_2_TO_5)))
+    assert engine.player_room == 5 and holds(engine, 5)
+    assert engine.player_pos == [11, 27]
+    assert not engine.move(UP)
+    assert engine.player_pos == [11, 27]
+
+
+def test_room_8_needs_both_keys(engine):
+    walk(engine, " ".join((TO_ROOM_1, ROOM_1_TO_2, ROOM_2_TO_5, "D9")))
+    assert engine.player_pos == [20, 27] and not holds(engine, 4) and not holds(engine, 6)
+    assert not engine.move(DOWN)    # into door (5, 8)
+
+    walk(engine, "U9 " + ROOM_5_TO_4)
+    assert holds(engine, 4) and not holds(engine, 6)
+    walk(engine, "R7 D4")
+    assert not engine.move(DOWN)
+
+    walk(engine, "U4 L7 " + ROOM_4_TO_6)
+    assert holds(engine, 4, 6)
+    walk(engine, ROOM_6_TO_8)
+    assert engine.player_room == 8 and engine.game_over
+
+
+def test_room_8_stays_shut_with_only_the_key_from_room_6(engine):
+    walk(engine, "D8 R4 D18 R15")   # down through rooms 3 and 6, then across room 7
+    assert engine.player_pos == [27, 20]
+    assert holds(engine, 6) and not holds(engine, 4)
+    assert not engine.move(RIGHT)   # into door (7, 8)
+
+
+@pytest.mark.parametrize("stop", [1, 3, 4, 5])
+def test_restore_rebuilds_the_same_open_doors(engine, stop):
+    routes = [TO_ROOM_1, ROOM_1_TO_2, ROOM_2_TO_5, ROOM_5_TO_4, ROOM_4_TO_6]
+    walk(engine, " ".join(routes[:stop]))
+    state = engine.snapshot()
+
+    fresh = GameEngine(engine.level)
+    fresh.restore(state)
+    assert fresh.doors.open_doors == engine.doors.open_doors
+    assert (fresh.walkable == engine.walkable).all()
+
+    # Restoring over a game that holds more keys has to close doors again.
+    ahead = GameEngine(engine.level)
+    walk(ahead, " ".join(routes + [ROOM_6_TO_8]))
+    ahead.restore(state)
+    assert ahead.doors.open_doors == engine.doors.open_doors
+    assert (ahead.walkable == engine.walkable).all()
+
+    # And the restored game plays on the same way.
+    walk(fresh, " ".join(routes[stop:] + [ROOM_6_TO_8]))
+    assert fresh.game_over
@@ -0,0 +1,48 @@
+"""solve() checked against fewest_moves(), which plays every reachable
+game state breadth first and so knows nothing of the solver's model."""
+import pytest
+
+import generator
+import levels
+from engine import GameEngine
+from solver import fewest_moves, solve
+
+# (rows, cols, items, locks) of small generated mazes, loopy enough that
+# the search can't lean on the tree-shaped estimate.
+MAZES = [(3, 3, 5, 1), (4, 4, 6, 2)]
+
+
+def wins_in(level, inputs):
+    engine = GameEngine(level)
+    for moves, direction in enumerate(inputs, 1):
+        engine.move(direction)
+        if engine.game_over:
+            return moves
+    return None
+
+
+@pytest.mark.parametrize("name", ["v2", "v3", "gates"])
+def test_par_is_fewest_moves_on_shipped_levels(name):
+    level = levels.LEVELS[name]
+    solution = solve(level)
+    assert solution.optimal
+    assert solution.par == solution.moves == fewest_moves(level)
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("rows, cols, items, locks", MAZES)
+def test_par_is_fewest_moves_on_random_mazes(rows, cols, items, locks, seed):
+    level = generator.generate(rows, cols, seed, items=items, locks=locks, loop_fraction=0.4)
+    solution = solve(level)
+    assert solution.optimal
+    assert solution.par == fewest_moves(level)
+    assert wins_in(level, solution.inputs) == solution.par
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_out_of_budget_still_wins(seed):
+    level = generator.generate(4, 4, seed, items=6, locks=2, loop_fraction=0.4)
+    solution = solve(level, budget=0)
+    assert not solution.optimal
+    assert wins_in(level, solution.inputs) == solution.par == solution.moves
+    assert solution.par >= fewest_moves(level)
@@ -0,0 +1,126 @@
+"""state.py's containers, and GameEngine.undo / restore built on them."""
+import pytest
+
+import generator
+import levels
+import solver
+from engine import GameEngine, RIGHT, UP
+from state import GameState, SnapshotRing, StateSet
+
+
+def state(n, moves=0):
+    return GameState(n, n + 1, 0, n & 3, 1, moves)
+
+
+def test_ring_pops_newest_first():
+    ring = SnapshotRing(4)
+    for n in range(3):
+        ring.push(state(n))
+    assert len(ring) == 3 and ring.peek() == state(2)
+    assert [ring.pop() for _ in range(3)] == [state(2), state(1), state(0)]
+    with pytest.raises(IndexError):
+        ring.pop()
+    with pytest.raises(IndexError):
+        ring.peek()
+
+
+def test_full_ring_drops_the_oldest():
+    ring = SnapshotRing(3)
+    for n in range(8):      # wraps around the slots twice
+        ring.push(state(n))
+    assert len(ring) == 3
+    assert [ring.pop() for _ in range(3)] == [state(7), state(6), state(5)]
+    assert not ring
+
+    # Pops and pushes across the wrap point keep their order too.
+    for n in range(5):
+        ring.push(state(n))
+    ring.pop()
+    ring.push(state(9))
+    assert [ring.pop() for _ in range(3)] == [state(9), state(3), state(2)]
+
+
+def test_ring_clear_and_capacity():
+    ring = SnapshotRing(2)
+    ring.push(state(1))
+    ring.clear()
+    assert len(ring) == 0
+    with pytest.raises(ValueError):
+        SnapshotRing(0)
+
+
+def test_state_set_ignores_moves():
+    seen = StateSet(levels.V3)
+    assert seen.add(state(1, moves=5))
+    assert not seen.add(state(1, moves=9))
+    assert state(1) in seen and state(2) not in seen
+    assert seen.add(state(2))
+    assert len(seen) == 2
+    # visited is part of the state.
+    other = state(1)
+    other.visited = 3
+    assert other not in seen
+
+
+def test_undo_takes_back_a_whole_solver_route():
+    level = levels.V3
+    solution = solver.solve(level)
+    engine = GameEngine(level, undo_depth=len(solution.inputs))
+    states = [engine.snapshot()]
+    for direction in solution.inputs:
+        assert engine.move(direction)
+        states.append(engine.snapshot())
+    assert engine.game_over
+
+    for back, expected in enumerate(reversed(states[:-1]), 1):
+        assert engine.undo()
+        assert engine.snapshot() == expected and engine.moves == expected.moves
+        # The doors undo leaves open are the ones playing that far opens.
+        replay = GameEngine(level).run(solution.inputs[:len(solution.inputs) - back])
+        assert engine.doors.open_doors == replay.doors.open_doors
+        assert (engine.walkable == replay.walkable).all()
+        assert engine.score == replay.score and not engine.game_over
+    assert not engine.undo()
+    assert engine.snapshot() == states[0] and engine.score == 0
+
+    # And the route plays the same again from the start.
+    for direction in solution.inputs:
+        engine.move(direction)
+    assert engine.snapshot() == states[-1] and engine.game_over
+
+
+def test_undo_only_reaches_back_undo_depth_moves():
+    engine = GameEngine(levels.V3, undo_depth=2)
+    start = engine.snapshot()
+    for direction in (RIGHT, RIGHT, RIGHT):
+        engine.move(direction)
+    assert engine.undo() and engine.undo()
+    assert not engine.undo()
+    assert engine.player_pos == [start.row, start.col + 1]
+    assert not GameEngine(levels.V3).undo()   # no history kept by default
+
+    # A move into the edge of the grid is not kept for undo.
+    engine = GameEngine(levels.V3, undo_depth=2)
+    assert engine.move(UP) and not engine.move(UP)
+    assert engine.undo() and not engine.undo()
+    assert engine.snapshot() == start
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_restore_jumps_between_any_two_points_of_a_route(seed):
+    level = generator.generate(4, 4, seed, items=6, locks=2, loop_fraction=0.3)
+    engine = GameEngine(level)
+    states = [engine.snapshot()]
+    for direction in solver.solve(level).inputs:
+        engine.move(direction)
+        states.append(engine.snapshot())
+
+    jumper = GameEngine(level)
+    for index in (len(states) - 1, 0, len(states) // 2, len(states) // 3, len(states) - 1):
+        jumper.restore(states[index])
+        fresh = GameEngine(level)
+        fresh.restore(states[index])
+        assert jumper.snapshot() == states[index]
+        assert jumper.doors.open_doors == fresh.doors.open_doors
+        assert (jumper.walkable == fresh.walkable).all()
+        assert jumper.game_over == (index == len(states) - 1)
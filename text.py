@@ -0,0 +1,63 @@
+import string
+from functools import lru_cache
+
+from bridges.named_symbol import NamedSymbol
+
+# Character -> symbol, built once. Letters are drawn in capitals; anything
+# without a glyph draws NamedSymbol.none.
+GLYPHS = {}
+for _letter in string.ascii_uppercase:
+    GLYPHS[_letter] = GLYPHS[_letter.lower()] = getattr(NamedSymbol, _letter)
+for _digit, _name in enumerate(["zero", "one", "two", "three", "four",
+                                "five", "six", "seven", "eight", "nine"]):
+    GLYPHS[str(_digit)] = getattr(NamedSymbol, _name)
+
+
+@lru_cache(maxsize=256)
+def compile_text(text, color):
+    """text as a tuple of (col offset, symbol, color) runs; spaces are skipped."""
+    return tuple((i, GLYPHS.get(ch, NamedSymbol.none), color)
+                 for i, ch in enumerate(text) if ch != " ")
+
+
+def draw_text(buffer, row, col, text, color):
+    """Draw text onto buffer starting at (row, col); return the cells drawn."""
+    cells = []
+    for offset, symbol, glyph_color in compile_text(text, color):
+        buffer.draw_symbol(row, col + offset, symbol, glyph_color)
+        cells.append((row, col + offset))
+    return cells
+
+
+class Label:
+    """A line of text on a layer, redrawn only when its text changes.
+
+    With width set the text is centred in the width columns from col.
+    hide() clears the cells back to transparent, so labels belong on a
+    layer that is composited over the scene (see renderer.Renderer).
+    """
+
+    def __init__(self, buffer, row, col, color, width=None):
+        self.buffer = buffer
+        self.row = row
+        self.col = col
+        self.color = color
+        self.width = width
+        self.text = None
+        self.cells = []
+
+    def show(self, text):
+        if text == self.text:
+            return
+        self.hide()
+        col = self.col
+        if self.width is not None:
+            col += max(0, (self.width - len(text)) // 2)
+        self.cells = draw_text(self.buffer, self.row, col, text, self.color)
+        self.text = text
+
+    def hide(self):
+        for r, c in self.cells:
+            self.buffer.clear(r, c, 1, 1)
+        self.cells = []
+        self.text = None
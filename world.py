@@ -0,0 +1,181 @@
+import numpy as np
+from bridges.named_symbol import NamedSymbol
+from bridges.named_color import NamedColor
+from framebuffer import FrameBuffer
+from layout import DOOR
+
+BLACK = NamedColor.black.value
+
+
+class World:
+    """The painted scene of a whole level, stored in square chunks.
+
+    The scene (walls, doors, rooms and items) lives in world coordinates,
+    however large the level. A chunk is painted the first time it is
+    looked at; after that only events (a room visited, an item taken, a
+    lock opened) repaint the cells they touch, and only in chunks that
+    exist. blit() copies a window into a display-sized FrameBuffer, so a
+    frame costs O(window) whatever the size of the world.
+    """
+
+    def __init__(self, level, engine, chunk_size=16):
+        self.level = level
+        self.layout = level.layout
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.rows = level.rows
+        self.cols = level.cols
+        self.chunks = {}
+        self.changed = True     # set on every repaint, cleared by blit()
+
+        # Colors of every room and door, indexed like layout.cells.
+        self.room_bg = np.array([self._room_color(idx) for idx in range(len(level.rooms))],
+                                dtype=np.int16)
+        self.door_bg = np.array([self._door_color(door) for door in range(len(self.layout.doors))],
+                                dtype=np.int16)
+        # Item tiles by the chunk they fall in.
+        half = level.room_size // 2
+        self.item_tiles = {}
+        self.chunk_items = {}
+        for idx, room in enumerate(level.rooms):
+            if room["item"]:
+                top, left = level.room_positions[idx]
+                tile = (top + half, left + half)
+                self.item_tiles[idx] = tile
+                key = (tile[0] // chunk_size, tile[1] // chunk_size)
+                self.chunk_items.setdefault(key, []).append(idx)
+
+    def _room_color(self, idx):
+        top, left = self.level.room_positions[idx]
+        # Locked rooms stay gray until their key is collected.
+        if not self.engine.walkable[top, left]:
+            return NamedColor.gray.value
+        if idx in self.engine.visited_rooms:
+            return NamedColor.lightgreen.value
+        return NamedColor.lightblue.value
+
+    def _door_color(self, door):
+        # Locked doors look like wall until unlocked.
+        return NamedColor.lightgreen.value if door in self.engine.doors.open_doors else BLACK
+
+    def chunk(self, chunk_row, chunk_col):
+        key = (chunk_row, chunk_col)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            size = self.chunk_size
+            chunk = self.chunks[key] = FrameBuffer(size, size, fill=BLACK)
+            chunk.symbol.fill(NamedSymbol.none.value)
+            top, left = chunk_row * size, chunk_col * size
+            self._paint(chunk, top, left, top, left, top + size, left + size)
+            for idx in self.chunk_items.get(key, ()):
+                self._paint_item(chunk, top, left, idx)
+        return chunk
+
+    def _paint(self, chunk, chunk_top, chunk_left, top, left, bottom, right):
+        """Repaint world rectangle [top, bottom) x [left, right), clipped to chunk and world."""
+        top, left = max(top, chunk_top, 0), max(left, chunk_left, 0)
+        bottom = min(bottom, chunk_top + self.chunk_size, self.rows)
+        right = min(right, chunk_left + self.chunk_size, self.cols)
+        if top >= bottom or left >= right:
+            return
+        cells = self.layout.cells[top:bottom, left:right]
+        bg = np.full(cells.shape, BLACK, dtype=np.int16)
+        rooms = cells >= 0
+        bg[rooms] = self.room_bg[cells[rooms]]
+        doors = cells <= DOOR
+        bg[doors] = self.door_bg[DOOR - cells[doors]]
+        target = (slice(top - chunk_top, bottom - chunk_top),
+                  slice(left - chunk_left, right - chunk_left))
+        chunk.bg[target] = bg
+        chunk.symbol[target] = NamedSymbol.none.value
+        chunk.symbol_color[target] = bg
+
+    def _paint_item(self, chunk, chunk_top, chunk_left, idx):
+        if idx in self.engine.items_collected:
+            return
+        r, c = self.item_tiles[idx]
+        chunk.symbol[r - chunk_top, c - chunk_left] = NamedSymbol.star.value
+        chunk.symbol_color[r - chunk_top, c - chunk_left] = NamedColor.orange.value
+
+    def _repaint(self, top, left, bottom, right, items=()):
+        size = self.chunk_size
+        for chunk_row in range(max(top, 0) // size, (bottom - 1) // size + 1):
+            for chunk_col in range(max(left, 0) // size, (right - 1) // size + 1):
+                chunk = self.chunks.get((chunk_row, chunk_col))
+                if chunk is None:
+                    continue  # painted from the current state when first seen
+                chunk_top, chunk_left = chunk_row * size, chunk_col * size
+                self._paint(chunk, chunk_top, chunk_left, top, left, bottom, right)
+                for idx in items:
+                    if self.item_tiles[idx][0] // size == chunk_row and \
+                            self.item_tiles[idx][1] // size == chunk_col:
+                        self._paint_item(chunk, chunk_top, chunk_left, idx)
+        self.changed = True
+
+    def repaint_room(self, idx):
+        self.room_bg[idx] = self._room_color(idx)
+        top, left = self.level.room_positions[idx]
+        size = self.level.room_size
+        items = (idx,) if idx in self.item_tiles else ()
+        self._repaint(top, left, top + size, left + size, items)
+
+    def repaint_door(self, door):
+        self.door_bg[door] = self._door_color(door)
+        tiles = self.layout.doors[door]
+        rows = [r for r, _ in tiles]
+        cols = [c for _, c in tiles]
+        self._repaint(min(rows), min(cols), max(rows) + 1, max(cols) + 1)
+
+    def blit(self, target, top, left):
+        """Copy the window at (top, left) the size of target into target."""
+        size = self.chunk_size
+        bottom, right = top + target.rows, left + target.cols
+        for chunk_row in range(top // size, (bottom - 1) // size + 1):
+            for chunk_col in range(left // size, (right - 1) // size + 1):
+                chunk = self.chunk(chunk_row, chunk_col)
+                chunk_top, chunk_left = chunk_row * size, chunk_col * size
+                r0, r1 = max(top, chunk_top), min(bottom, chunk_top + size)
+                c0, c1 = max(left, chunk_left), min(right, chunk_left + size)
+                target.paste(r0 - top, c0 - left, chunk, r0 - chunk_top, c0 - chunk_left,
+                             r1 - r0, c1 - c0)
+        self.changed = False
+
+
+class Camera:
+    """Top-left corner of the visible window, following the player.
+
+    The window only scrolls once the player comes within margin tiles of
+    its edge, and never past the edge of the world.
+    """
+
+    def __init__(self, view_rows, view_cols, world_rows, world_cols, margin=None):
+        self.view_rows = view_rows
+        self.view_cols = view_cols
+        self.max_top = max(0, world_rows - view_rows)
+        self.max_left = max(0, world_cols - view_cols)
+        self.margin = min(view_rows, view_cols) // 4 if margin is None else margin
+        self.top = 0
+        self.left = 0
+
+    def follow(self, row, col):
+        """Scroll so (row, col) is at least margin tiles inside; return True if it moved."""
+        top = self._scroll(self.top, row, self.view_rows, self.max_top)
+        left = self._scroll(self.left, col, self.view_cols, self.max_left)
+        moved = (top, left) != (self.top, self.left)
+        self.top, self.left = top, left
+        return moved
+
+    def center(self, row, col):
+        self.top = min(max(0, row - self.view_rows // 2), self.max_top)
+        self.left = min(max(0, col - self.view_cols // 2), self.max_left)
+
+    def _scroll(self, start, pos, view, limit):
+        margin = min(self.margin, (view - 1) // 2)
+        if pos < start + margin:
+            start = pos - margin
+        elif pos > start + view - 1 - margin:
+            start = pos - view + 1 + margin
+        return min(max(0, start), limit)
+
+    def to_screen(self, row, col):
+        return row - self.top, col - self.left